@@ -1,5 +1,6 @@
 from numpy import *
-import pylab as P
+from plotting import pyplot
+import powerAllocationGame as game
 
 
 
@@ -105,7 +106,9 @@ def nextPowerConfigurationSequential(transList, recList, sigmaSquared, pMax, c):
   return newTransList
   
 
-def averageSystemCapacity(pMax, c, numUsers):
+# With a ConvergenceDetector the power updates of a simulation stop as soon as
+# the powers have settled; its history then holds the iterations each took
+def averageSystemCapacity(pMax, c, numUsers, convergence = None):
   sigmaSq = 1e-12
   cap = 0.0
   numSimulation = 1000
@@ -113,6 +116,10 @@ def averageSystemCapacity(pMax, c, numUsers):
     tra, rec = allocateSystem(numUsers)
     for iter in range(10):
       tra = nextPowerConfigurationSequential(tra, rec, sigmaSq, pMax, c)
+      if convergence is not None and convergence.update([t.p for t in tra]):
+        break
+    if convergence is not None:
+      convergence.finish()
     cap = cap + systemCapacity(tra, rec, sigmaSq)
   return cap/numSimulation  
 
@@ -131,25 +138,34 @@ def testSystemConvergence(pMax, c, numUsers):
     for i in range(numUsers):
       powerData[i][iterr+1] = tra[i].p
   print(systemCapacity(tra, rec, sigmaSq))
+  P = pyplot()
   P.figure()
   for i in range(numUsers):
     P.plot(powerData[i, :])
   P.show()
 
 # change number of users and observe the change of full or average system capacity
-def systemCapacityVsNumberOfUsers(c):
+# (batched plays all simulations of a point at once with the array engine,
+# shared also plays every pMax on the same simulated systems)
+def systemCapacityVsNumberOfUsers(c, batched = True, shared = False):
+  capacity = game.averageSystemCapacity if batched else averageSystemCapacity
   users = arange(2, 21, 1)
   cap1 = []
   cap2 = []
   cap3 = []
   cap4 = []
   for u in users:
-    cap1.append(averageSystemCapacity(0.1, c, u)*u)   #multiplication by u should be removes if we are interested in
-    cap2.append(averageSystemCapacity(1.0, c, u)*u)   #averaged capacity for one user
-    cap3.append(averageSystemCapacity(2.0, c, u)*u)
-    cap4.append(averageSystemCapacity(4.0, c, u)*u)
+    if shared:
+      caps = game.systemCapacitySweep([0.1, 1.0, 2.0, 4.0], [c], u)[:,0]
+    else:
+      caps = [capacity(0.1, c, u), capacity(1.0, c, u), capacity(2.0, c, u), capacity(4.0, c, u)]
+    cap1.append(caps[0]*u)   #multiplication by u should be removes if we are interested in
+    cap2.append(caps[1]*u)   #averaged capacity for one user
+    cap3.append(caps[2]*u)
+    cap4.append(caps[3]*u)
     print(u)
     
+  P = pyplot()
   P.figure()
   P.plot(users, cap1, "k*-", label = "Pmax = 0.1 W")
   P.plot(users, cap2, "ko-", label = "Pmax = 1 W")
@@ -160,8 +176,9 @@ def systemCapacityVsNumberOfUsers(c):
   P.ylabel("Full system capacity, bits/s/Hz")
   P.show()
 
-testSystemConvergence(2, 0.5, 10)  
-systemCapacityVsNumberOfUsers(0.25)
+if __name__ == '__main__':
+  testSystemConvergence(2, 0.5, 10)
+  systemCapacityVsNumberOfUsers(0.25)
 
 
 
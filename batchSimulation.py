@@ -0,0 +1,196 @@
+from numpy import *
+from networkModel import *
+from interferenceState import *
+from powervariation_sim import newApSnrFloor, newApPowers, newApPowersControl, inRange, hasConverged
+from precisionCheck import checkPrecision
+import warnings
+
+# Many deployments with the same layout (one per Monte Carlo trial) stacked
+# along a leading trial axis. Each trial is first built as a Deployment, whose
+# arrays are then replaced by views into the batched arrays, so the networks of
+# every trial keep reflecting the batched state. dtype is the precision of the
+# gain and distance matrices (see PathGainMatrix).
+class BatchedDeployment:
+    def __init__(self, trials, dtype = float):
+        self.deployments = map(lambda trial: Deployment(trial, dtype = dtype), trials)
+        first = self.deployments[0]
+        for name in STATION_FIELDS + MEMORY_FIELDS + ['gain', 'distance']:
+            batched = array(map(lambda d: getattr(d, name), self.deployments))
+            setattr(self, name, batched)
+            for t in range(len(self.deployments)):
+                setattr(self.deployments[t], name, batched[t])
+        self.numTrials = len(self.deployments)
+        self.network = first.network
+        self.numNetworks = first.numNetworks
+        self.accessPointRows = first.accessPointRows
+        self.mobileStationRows = first.mobileStationRows
+        self.index = map(lambda network: network.index, first.networks)
+
+    def update(self):
+        changed = False
+        for t in range(self.numTrials):
+            d = self.deployments[t]
+            if d.update():
+                self.gain[t] = d.gain
+                self.distance[t] = d.distance
+                d.gain = self.gain[t]
+                d.distance = self.distance[t]
+                changed = True
+        return changed
+
+    def networkStations(self, j):
+        return self.network == j
+
+    def otherStations(self, j):
+        return self.network != j
+
+# Time series of every network in every trial, indexed [trial, network, iteration]
+class BatchRecording:
+    def __init__(self, index, numTrials, numIterations):
+        self.index = index
+        shape = (numTrials, len(index), numIterations)
+        self.apPower = zeros(shape)
+        self.apGain = zeros(shape)
+        self.normalisedThroughput = zeros(shape)
+        self.dataRate = zeros(shape)
+        self.utility = zeros(shape)
+        self.iterationsToConverge = None
+
+    def addDataPoint(self, j, i, p, gr, S, r, u):
+        self.apPower[:,j,i] = p
+        self.apGain[:,j,i] = gr
+        self.normalisedThroughput[:,j,i] = S
+        self.dataRate[:,j,i] = r
+        self.utility[:,j,i] = u
+
+    def networksInRange(self, iRange, jRange):
+        return array(map(lambda index: inRange(index[0], iRange) and inRange(index[1], jRange), self.index))
+
+    # normalised throughput, data rate, AP power, throughput and utility summed over trials
+    def sumOverTrials(self, networks):
+        return (self.normalisedThroughput[:,networks].sum(axis=0),
+                self.dataRate[:,networks].sum(axis=0),
+                self.apPower[:,networks].sum(axis=0),
+                (self.dataRate[:,networks] * self.normalisedThroughput[:,networks]).sum(axis=0),
+                self.utility[:,networks].sum(axis=0))
+
+    # repeat each trial's data point of the iteration it converged at (or the
+    # last one run) up to the end, for runs that stopped early. Nothing is
+    # padded when no iteration ran (lastIteration -1).
+    def pad(self, lastIteration, iterationsToConverge):
+        if lastIteration < 0:
+            return
+        last = where(iterationsToConverge > 0, iterationsToConverge - 1, lastIteration) * ones(len(self.apPower), dtype=int)
+        for series in [self.apPower, self.apGain, self.normalisedThroughput, self.dataRate, self.utility]:
+            for t in range(len(last)):
+                series[t,:,last[t]+1:] = series[t,:,last[t],newaxis]
+
+    # series of every trial indexed [trial, series, network, iteration], the
+    # series in the order of streamingRecorder.SERIES
+    def series(self):
+        return stack([self.normalisedThroughput, self.dataRate, self.apPower,
+                      self.normalisedThroughput * self.dataRate, self.utility], axis=1)
+
+    # recordings of one trial in the form returned by runPowerVariationAlgorithm
+    def trialRecordings(self, t):
+        recordings = []
+        for j in range(len(self.index)):
+            recording = Recording(self.index[j])
+            recording.apPower = list(self.apPower[t,j])
+            recording.apGain = list(self.apGain[t,j])
+            recording.normalisedThroughput = list(self.normalisedThroughput[t,j])
+            recording.dataRate = list(self.dataRate[t,j])
+            recording.utility = list(self.utility[t,j])
+            if self.iterationsToConverge is not None and self.iterationsToConverge[t] > 0:
+                recording.iterationsToConverge = int(self.iterationsToConverge[t])
+            recordings.append(recording)
+        return recordings
+
+# newApPower for one network of every trial
+def newApPowerBatch(state, j, c):
+    row = state.deployment.accessPointRows[j]
+    return newApPowers(state.deployment, row, state.throughput(j, EXPECTED_PACKET_SIZE), state.dataRate(j), c)
+
+# newApPowerControl for one network of every trial, the branches of the scalar
+# controller being taken per trial with where()
+def newApPowerControlBatch(state, j, maxPower, powerExponent):
+    row = state.deployment.accessPointRows[j]
+    return newApPowersControl(state.deployment, row, state.throughput(j, EXPECTED_PACKET_SIZE), state.dataRate(j), maxPower, powerExponent)
+
+# newPower(state, j) updates one network at a time, or with newPowers(state, S, r)
+# every network is updated at once (Jacobi) from the measured throughputs and
+# data rates, indexed [trial, network]. With a reduced precision dtype (float32)
+# the gains and received powers of all trials take half the memory, and the
+# first trial is checked against the float64 engine before the run: if its
+# errors exceed the tolerance of precisionCheck a warning gives them and the
+# run falls back to float64.
+def runBatch(trials, numIterations, newPower, convergence = None, newPowers = None, dtype = float):
+    if finfo(dtype).bits < 64:
+        exceeded = checkPrecision(trials[0], dtype)
+        if exceeded:
+            warnings.warn('%s errors above tolerance (%s), running in float64 instead'
+                          % (finfo(dtype).dtype, ', '.join('%s %.3g' % (name, exceeded[name]) for name in sorted(exceeded))))
+            dtype = float
+    deployment = BatchedDeployment(trials, dtype)
+    state = InterferenceState(deployment)
+    recording = BatchRecording(deployment.index, deployment.numTrials, numIterations)
+    i = -1
+    for i in range(numIterations):
+        throughputs = state.throughputs(EXPECTED_PACKET_SIZE)
+        dataRates = state.dataRates()
+        for j in range(deployment.numNetworks):
+            row = deployment.accessPointRows[j]
+            recording.addDataPoint(j, i, deployment.p[:,row], deployment.gr[:,row], throughputs[:,j], dataRates[:,j], deployment.prevU[:,row])
+        if convergence is not None and hasConverged(convergence, deployment):
+            break
+        if newPowers is not None:
+            p = newPowers(state, throughputs, dataRates)
+            state.setPowers(deployment.accessPointRows, p, newApSnrFloor(p))
+            continue
+        for j in range(deployment.numNetworks):
+            p = newPower(state, j)
+            state.setPower(deployment.accessPointRows[j], p, newApSnrFloor(p))
+    if convergence is not None:
+        recording.pad(i, convergence.iterationsToConverge)
+        recording.iterationsToConverge = convergence.iterationsToConverge * ones(deployment.numTrials, dtype=int)
+        convergence.finish()
+    return recording
+
+# runPowerVariationAlgorithm for a list of trials, each a list of networks with
+# the same layout as returned by createNetworks
+def runBatchedPowerVariationAlgorithm(trials, numIterations, c = 20, convergence = None, synchronous = False, dtype = float):
+    newPowers = None
+    if synchronous:
+        newPowers = lambda state, S, r: newApPowers(state.deployment, state.deployment.accessPointRows, S, r, c)
+    return runBatch(trials, numIterations, lambda state, j: newApPowerBatch(state, j, c), convergence, newPowers, dtype)
+
+def runBatchedPowerVariationAlgorithmControl(trials, numIterations, maxPower, powerCost, convergence = None, synchronous = False, dtype = float):
+    newPowers = None
+    if synchronous:
+        newPowers = lambda state, S, r: newApPowersControl(state.deployment, state.deployment.accessPointRows, S, r, maxPower, powerCost)
+    return runBatch(trials, numIterations, lambda state, j: newApPowerControlBatch(state, j, maxPower, powerCost), convergence, newPowers, dtype)
+
+# Yields the networks and recordings of each Monte Carlo trial, trial t being
+# created by createTrial(t). Without a batch size every trial is created and
+# run on its own with runTrial(networks, recordings), otherwise the trials are
+# created batchSize at a time and run
+# together with runTrials. With a StreamingRecorder every trial is also added
+# to it, the serial runs recording straight into its buffers.
+def monteCarloTrials(createTrial, runTrial, runTrials, mcIterations, batchSize=None, recorder=None):
+    if batchSize is None:
+        for i in range(mcIterations):
+            networks = createTrial(i)
+            if recorder is None:
+                yield networks, runTrial(networks, None)
+                continue
+            recordings = runTrial(networks, recorder.newTrial(networks))
+            recorder.endTrial()
+            yield networks, recordings
+        return
+    for start in range(0, mcIterations, batchSize):
+        trials = map(createTrial, range(start, min(start + batchSize, mcIterations)))
+        recording = runTrials(trials)
+        if recorder is not None:
+            recorder.addTrials(recording.index, recording.series())
+        for t in range(len(trials)):
+            yield trials[t], recording.trialRecordings(t)
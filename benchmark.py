@@ -0,0 +1,178 @@
+from numpy import *
+from multiprocessing import Pool
+from powervariation_sim import *
+import powerAllocationGame as game
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+# Benchmarks of the network model and power control hot paths on fixed-seed
+# deployments of increasing size. Every case runs in a fresh process so its
+# peak memory can be read from getrusage, and is timed over enough calls to
+# fill minTime. The results can be saved as a baseline JSON and later runs
+# compared against it. --startup instead times the cold import of each
+# module of the compute core, which is paid by every worker process, and
+# reports any module that pulls in matplotlib.
+
+# name, cell grid (a, b) and mobile stations per cell (one AP per cell on top)
+SCENARIOS = [('2x2-6', 2, 2, 5),
+             ('5x4-30', 5, 4, 29),
+             ('5x4-100', 5, 4, 99),
+             ('10x10-30', 10, 10, 29),
+             ('20x20-6', 20, 20, 5)]
+
+# name, users and simulated systems of the ISM-band game
+ISM_SCENARIOS = [('ism-5', 5, 200),
+                 ('ism-20', 20, 200),
+                 ('ism-50', 50, 200)]
+
+# modules of the compute core whose cold import is timed by --startup
+STARTUP_MODULES = ['networkModel', 'interferenceState', 'powervariation_sim', 'batchSimulation',
+                   'parallelRunner', 'powerAllocationGame', 'monteCarlo',
+                   'proportionalControlMonteCarlo', 'scenarioRunner']
+
+# modules that must not be loaded by importing the compute core
+HEAVY_MODULES = ['matplotlib', 'pylab']
+
+# run in a fresh interpreter: numpy is imported first so the time of the
+# module itself is separated from the cost of numpy
+STARTUP_SCRIPT = '''import sys, time, json
+start = time.time()
+import numpy
+numpySeconds = time.time() - start
+start = time.time()
+import %s
+print(json.dumps(dict(numpy=numpySeconds, module=time.time() - start,
+                      heavy=[name for name in %r if name in sys.modules])))
+'''
+
+def scenarioNetworks(a, b, n):
+    return createNetworks(a, b, 7, 7, 7, 7, n, False, seed = 0)
+
+# seconds per call of f, best of repeat runs of enough calls to fill minTime
+def timeCalls(f, minTime, repeat = 3):
+    start = time.time()
+    f()
+    once = time.time() - start
+    calls = max(1, int(minTime / max(once, 1e-9)))
+    best = once
+    for k in range(repeat):
+        start = time.time()
+        for call in range(calls):
+            f()
+        best = min(best, (time.time() - start) / calls)
+    return best
+
+# the function timed by a case and the network evaluations done by one call
+def caseFunction(case, scenario):
+    if case == 'averageSystemCapacity':
+        name, numUsers, numSimulation = scenario
+        return (lambda: game.averageSystemCapacity(1.0, 0.25, numUsers, numSimulation)), numSimulation
+    name, a, b, n = scenario
+    networks = scenarioNetworks(a, b, n)
+    if case == 'runPowerVariationAlgorithm':
+        return (lambda: runPowerVariationAlgorithm(networks, 1)), len(networks)
+    deployment = Deployment(networks)
+    others = map(deployment.otherStations, range(len(networks)))
+    if case == 'normalisedNetworkThroughput':
+        evaluate = lambda j: normalisedNetworkThroughput(networks[j], others[j], EXPECTED_PACKET_SIZE, deployment)
+    else:
+        evaluate = lambda j: getAverageDataRate20MHZ(networks[j], others[j], deployment)
+    return (lambda: map(evaluate, range(len(networks)))), len(networks)
+
+def runCase(job):
+    case, scenario, minTime = job
+    memoryBefore = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    f, evaluations = caseFunction(case, scenario)
+    seconds = timeCalls(f, minTime)
+    peakMemory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return dict(case=case, scenario=scenario[0], latency=seconds,
+                evaluationsPerSecond=evaluations / seconds,
+                peakMemoryKb=peakMemory, caseMemoryKb=peakMemory - memoryBefore)
+
+def cases(scenarioNames = None):
+    jobs = []
+    for scenario in SCENARIOS:
+        if scenarioNames is None or scenario[0] in scenarioNames:
+            for case in ['normalisedNetworkThroughput', 'getAverageDataRate20MHZ', 'runPowerVariationAlgorithm']:
+                jobs.append((case, scenario))
+    for scenario in ISM_SCENARIOS:
+        if scenarioNames is None or scenario[0] in scenarioNames:
+            jobs.append(('averageSystemCapacity', scenario))
+    return jobs
+
+def runBenchmarks(scenarioNames = None, minTime = 0.5):
+    results = []
+    for case, scenario in cases(scenarioNames):
+        pool = Pool(1)
+        result = pool.apply(runCase, [(case, scenario, minTime)])
+        pool.close()
+        pool.join()
+        print('%-28s %-9s %12.6f s/call %14.1f evals/s %10d kB peak' % (result['case'], result['scenario'], result['latency'],
+                                                                         result['evaluationsPerSecond'], result['peakMemoryKb']))
+        results.append(result)
+    return results
+
+# best cold import time of each module over repeat fresh interpreters
+def runStartupBenchmarks(modules = None, repeat = 5):
+    directory = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    for module in modules or STARTUP_MODULES:
+        runs = []
+        for k in range(repeat):
+            output = subprocess.check_output([sys.executable, '-c', STARTUP_SCRIPT % (module, HEAVY_MODULES)],
+                                             cwd = directory)
+            runs.append(json.loads(output.decode().strip().splitlines()[-1]))
+        best = min(runs, key = lambda run: run['module'])
+        print('%-30s %10.4f s import %10.4f s numpy %s' % (module, best['module'], best['numpy'],
+                                                         ' loads ' + ', '.join(best['heavy']) if best['heavy'] else ''))
+        results.append(dict(case='import', scenario=module, latency=best['module'],
+                            numpyLatency=best['numpy'], heavyModules=best['heavy']))
+    return results
+
+def resultKey(result):
+    return result['case'] + ' ' + result['scenario']
+
+# cases whose latency grew by more than tolerance relative to the baseline
+def compareResults(results, baseline, tolerance = 0.1):
+    baselineResults = dict((resultKey(result), result) for result in baseline)
+    regressions = []
+    for result in results:
+        if resultKey(result) not in baselineResults:
+            continue
+        ratio = result['latency'] / baselineResults[resultKey(result)]['latency']
+        status = 'slower' if ratio > 1 + tolerance else ('faster' if ratio < 1 - tolerance else '')
+        print('%-38s %6.2fx %s' % (resultKey(result), ratio, status))
+        if ratio > 1 + tolerance:
+            regressions.append(resultKey(result))
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the network model and power control hot paths')
+    parser.add_argument('--scenarios', help='comma separated scenario names, default all of ' +
+                        ', '.join(map(lambda s: s[0], SCENARIOS + ISM_SCENARIOS)))
+    parser.add_argument('--min-time', type=float, default=0.5, help='seconds of calls per timing')
+    parser.add_argument('--startup', action='store_true',
+                        help='time the cold import of the compute core modules instead')
+    parser.add_argument('--modules', help='comma separated modules for --startup, default all of ' +
+                        ', '.join(STARTUP_MODULES))
+    parser.add_argument('--save', help='write the results to this baseline JSON')
+    parser.add_argument('--compare', help='compare the results with this baseline JSON')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='relative slowdown reported as a regression')
+    args = parser.parse_args()
+
+    if args.startup:
+        results = runStartupBenchmarks(args.modules.split(',') if args.modules else None)
+    else:
+        results = runBenchmarks(args.scenarios.split(',') if args.scenarios else None, args.min_time)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            if compareResults(results, json.load(f), args.tolerance):
+                sys.exit(1)
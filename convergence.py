@@ -0,0 +1,49 @@
+from numpy import *
+
+# Decides when a power control loop has settled. A run has converged once no
+# AP power changed by more than powerTolerance and no utility by more than
+# utilityTolerance (relative to the utility, or absolute below 1) since the
+# previous iteration. The powers and utilities passed to update() may carry a
+# leading trial axis, in which case every trial converges on its own and the
+# run is done once all of them have. maxIterations caps the run either way.
+class ConvergenceDetector:
+    def __init__(self, powerTolerance=1e-4, utilityTolerance=1e-4, maxIterations=None):
+        self.powerTolerance = powerTolerance
+        self.utilityTolerance = utilityTolerance
+        self.maxIterations = maxIterations
+        self.history = []
+        self.reset()
+
+    def reset(self):
+        self.iterations = 0
+        self.previous = None
+        self.converged = bool_(False)
+        self.iterationsToConverge = -1
+
+    # register the powers and utilities of one iteration and tell whether the
+    # run can stop
+    def update(self, powers, utilities=None):
+        powers = array(powers, dtype=float)
+        if utilities is not None:
+            utilities = array(utilities, dtype=float)
+        self.iterations += 1
+        settled = zeros(powers.shape[:-1], dtype=bool)
+        if self.previous is not None:
+            previousPowers, previousUtilities = self.previous
+            settled = (abs(powers - previousPowers) <= self.powerTolerance).all(axis=-1)
+            if utilities is not None:
+                tolerance = self.utilityTolerance * maximum(abs(previousUtilities), 1)
+                settled &= (abs(utilities - previousUtilities) <= tolerance).all(axis=-1)
+        self.iterationsToConverge = where(settled & ~self.converged, self.iterations, self.iterationsToConverge)
+        self.converged = self.converged | settled
+        self.previous = (powers, utilities)
+        return self.done()
+
+    def done(self):
+        return bool(self.converged.all()) or (self.maxIterations is not None and self.iterations >= self.maxIterations)
+
+    # keep the iterations to convergence of the finished run (-1 if it did not
+    # converge) and start a new one
+    def finish(self):
+        self.history.append(self.iterationsToConverge)
+        self.reset()
@@ -0,0 +1,183 @@
+from numpy import *
+from networkModel import *
+
+# Incremental evaluation of the network model for a deployment whose station
+# positions are fixed and whose transmit powers change one at a time.
+# For every receiver it keeps the power received from the stations of other
+# networks that it cannot decode (interference) and the log-probability that
+# none of the other networks' stations it hears as co-channel transmits.
+# A power change of one station only touches its row (as a transmitter) and
+# its column (as a receiver, through its SNR floor) of the received power
+# matrix, so setPower updates the aggregates in O(N).
+# The deployment arrays may carry a leading trial axis, in which case every
+# quantity is evaluated for all trials at once. Stations moving, leaving and
+# joining (moveStation, setBufferProbability, setActive) are only supported
+# without one.
+# The received powers are held in the precision of the deployment's gains
+# (float32 with Deployment(..., dtype=float32)) while the interference and
+# every other aggregate is accumulated in float64.
+class InterferenceState:
+    def __init__(self, deployment, whiteNoise=WHITE_NOISE, mcsTable=None):
+        self.deployment = deployment
+        self.whiteNoise = whiteNoise
+        self.mcsTable = mcsTable or MCS_TABLE_20MHZ
+        self.tau = estimateTransmissionProbability(CW_MIN, deployment.q)
+        self.logIdle = log(1 - self.tau)
+        self.initialiseLinks()
+        # the stations of a network are consecutive rows, its AP last
+        self.networkRows = map(lambda ap, ms: append(ms, ap).astype(int), deployment.accessPointRows, deployment.mobileStationRows)
+        self.mobileStationRows = concatenate(deployment.mobileStationRows)
+        servingRows = concatenate(map(lambda ap, ms: repeat(ap, len(ms)), deployment.accessPointRows, deployment.mobileStationRows))
+        self.servingAccessPointRows = servingRows.astype(int)
+        self.active = ones(len(deployment.network), dtype=bool)
+        self.updateMobileStationWeights()
+        self.refresh()
+
+    # which pairs of stations belong to different networks
+    def initialiseLinks(self):
+        d = self.deployment
+        self.dtype = d.gain.dtype
+        self.otherNetwork = d.network[:,newaxis] != d.network
+
+    # recompute every aggregate from scratch, also needed after stations move
+    def refresh(self):
+        d = self.deployment
+        d.update()
+        self.received = d.p[...,:,newaxis].astype(self.dtype) * d.gain * d.gr[...,newaxis,:].astype(self.dtype)
+        self.cochannel = self.received / self.whiteNoise > d.snrFloor[...,newaxis,:]
+        self.interference = (self.received * (self.otherNetwork & ~self.cochannel)).sum(axis=-2, dtype=float)
+        self.logCochannelIdle = (self.logIdle[...,:,newaxis] * (self.otherNetwork & self.cochannel)).sum(axis=-2)
+        self.propagationDelay = propagationDelays(d)
+        for j in unique(d.network[~self.active]):
+            self.updatePropagationDelay(j)
+
+    # data rates average over the active mobile stations of each network
+    def updateMobileStationWeights(self):
+        d = self.deployment
+        active = self.active[self.mobileStationRows]
+        self.mobileStationNetworks = d.network[self.mobileStationRows]
+        with errstate(divide='ignore', invalid='ignore'):
+            self.mobileStationWeights = active / bincount(self.mobileStationNetworks, active, d.numNetworks)[self.mobileStationNetworks]
+
+    def updatePropagationDelay(self, j):
+        d = self.deployment
+        ms = d.mobileStationRows[j][self.active[d.mobileStationRows[j]]]
+        self.propagationDelay[...,j] = d.distance[...,d.accessPointRows[j],ms].mean(axis=-1, dtype=float) / C
+
+    # stations moved: their gains are updated and they are re-evaluated both
+    # as transmitters and as receivers, in O(N) per station. When more than
+    # half of the stations moved rebuilding everything is cheaper.
+    def moveStations(self, rows):
+        rows = asarray(rows, dtype=int)
+        d = self.deployment
+        if len(rows) == 0:
+            return
+        if 2 * len(rows) > len(d.network):
+            self.refresh()
+            return
+        d.updateRows(rows)
+        other = self.otherNetwork[rows]
+        received = (d.p[rows,newaxis] * d.gain[rows,:] * d.gr).astype(self.dtype)
+        cochannel = received / self.whiteNoise > d.snrFloor
+        self.interference += (other * (received.astype(float) * ~cochannel - self.received[rows,:] * ~self.cochannel[rows,:])).sum(axis=0)
+        self.logCochannelIdle += (other * self.logIdle[rows,newaxis] * (cochannel.astype(float) - self.cochannel[rows,:])).sum(axis=0)
+        self.received[rows,:] = received
+        self.cochannel[rows,:] = cochannel
+        # the receivers in rows are evaluated again from scratch
+        column = (d.p[:,newaxis] * d.gain[:,rows] * d.gr[rows]).astype(self.dtype)
+        cochannel = column / self.whiteNoise > d.snrFloor[rows]
+        other = self.otherNetwork[:,rows]
+        self.received[:,rows] = column
+        self.cochannel[:,rows] = cochannel
+        self.interference[rows] = (column * (other & ~cochannel)).sum(axis=0, dtype=float)
+        self.logCochannelIdle[rows] = (self.logIdle[:,newaxis] * (other & cochannel)).sum(axis=0)
+        for j in unique(d.network[rows]):
+            self.updatePropagationDelay(j)
+
+    def moveStation(self, row):
+        self.moveStations([row])
+
+    # probability of a non-empty buffer of one station, which sets how often it
+    # contends for the channel
+    def setBufferProbability(self, row, q):
+        d = self.deployment
+        d.q[row] = q
+        tau = estimateTransmissionProbability(CW_MIN, q)
+        logIdle = log(1 - tau)
+        self.logCochannelIdle += self.otherNetwork[row] * (logIdle - self.logIdle[row]) * self.cochannel[row,:]
+        self.tau[row] = tau
+        self.logIdle[row] = logIdle
+
+    # a mobile station leaving (or joining) its network: it is dropped from the
+    # data rate and propagation delay averages of the network. The caller also
+    # sets its power and buffer probability to zero (or back).
+    def setActive(self, row, active):
+        self.active[row] = active
+        self.updateMobileStationWeights()
+        self.updatePropagationDelay(self.deployment.network[row])
+
+    def setPower(self, row, p, snrFloor):
+        d = self.deployment
+        d.p[...,row] = p
+        d.snrFloor[...,row] = snrFloor
+        other = self.otherNetwork[row]
+        received = (asarray(p)[...,newaxis] * d.gain[...,row,:] * d.gr).astype(self.dtype)
+        cochannel = received / self.whiteNoise > d.snrFloor
+        self.interference += other * (received.astype(float) * ~cochannel - self.received[...,row,:] * ~self.cochannel[...,row,:])
+        self.logCochannelIdle += other * self.logIdle[...,row,newaxis] * (cochannel.astype(float) - self.cochannel[...,row,:])
+        self.received[...,row,:] = received
+        self.cochannel[...,row,:] = cochannel
+        # the new SNR floor changes which transmitters the station itself decodes
+        column = self.received[...,:,row] / self.whiteNoise > asarray(snrFloor)[...,newaxis]
+        other = self.otherNetwork[:,row]
+        self.cochannel[...,:,row] = column
+        self.interference[...,row] = (self.received[...,:,row] * (other & ~column)).sum(axis=-1, dtype=float)
+        self.logCochannelIdle[...,row] = (self.logIdle * (other & column)).sum(axis=-1)
+
+    # setPower for several rows, p and snrFloor being indexed [..., k] like rows
+    def setPowers(self, rows, p, snrFloor):
+        for k in range(len(rows)):
+            self.setPower(rows[k], p[...,k], snrFloor[...,k])
+
+    def sinr(self, transmitterRow, receiverRows):
+        return self.received[...,transmitterRow,receiverRows] / (self.interference[...,receiverRows] + self.whiteNoise)
+
+    def throughput(self, j, expectedPayload):
+        rows = self.networkRows[j]
+        tau = self.tau[...,rows]
+        idle = 1 - tau
+        allIdle = product(idle, axis=-1)
+        pExactlyOneTransmission = (tau * allIdle[...,newaxis] / idle * exp(self.logCochannelIdle[...,rows])).sum(axis=-1)
+        return dcfThroughput(pExactlyOneTransmission, 1 - allIdle, self.propagationDelay[...,j], expectedPayload)
+
+    # normalised throughput of every network
+    def throughputs(self, expectedPayload):
+        d = self.deployment
+        return dcfNetworks(self.tau, d.network, d.numNetworks, self.logCochannelIdle, self.propagationDelay, expectedPayload)[2]
+
+    def dataRate(self, j):
+        d = self.deployment
+        rows = d.mobileStationRows[j]
+        if not self.active[rows].all():
+            rows = rows[self.active[rows]]
+        return mean(self.mcsTable.dataRate(self.sinr(d.accessPointRows[j], rows)), axis=-1)
+
+    # SINR of every mobile station from its own access point, in the order of
+    # mobileStationRows
+    def mobileStationSinrs(self):
+        received = self.received[...,self.servingAccessPointRows,self.mobileStationRows]
+        return received / (self.interference[...,self.mobileStationRows] + self.whiteNoise)
+
+    # average data rate of every network
+    def dataRates(self):
+        rates = self.mcsTable.dataRate(self.mobileStationSinrs()) * self.mobileStationWeights
+        return networkSums(rates, self.mobileStationNetworks, self.deployment.numNetworks)
+
+    def networkOf(self, network):
+        return self.deployment.network[network.accessPoint.row]
+
+    def normalisedNetworkThroughput(self, network, expectedPayload):
+        return self.throughput(self.networkOf(network), expectedPayload)
+
+    def getAverageDataRate20MHZ(self, network):
+        return self.dataRate(self.networkOf(network))
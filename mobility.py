@@ -0,0 +1,89 @@
+from numpy import *
+from networkModel import *
+from numpy.random import RandomState
+
+# Time-varying topologies for the power control loops, passed to
+# runPowerVariationAlgorithm(..., mobility=[...]). Before every iteration but
+# the first each model advances one step and updates the InterferenceState
+# for the stations it touched only, so a step costs O(N) per station moved or
+# churned instead of an O(N^2) rebuild.
+
+# bounds of the cell of every mobile station, in the order of the rows
+def cellBounds(networks, rows, network):
+    xOffset = array([networks[j].xOffset for j in network[rows]])
+    yOffset = array([networks[j].yOffset for j in network[rows]])
+    width = array([networks[j].width for j in network[rows]])
+    length = array([networks[j].length for j in network[rows]])
+    return xOffset, yOffset, width, length
+
+# Random waypoint model: every mobile station walks at speed (distance per
+# iteration) to a random point of its own cell, waits there for pause
+# iterations and heads for the next one.
+class RandomWaypoint:
+    def __init__(self, networks, speed, pause = 0, seed = None):
+        self.networks = networks
+        self.speed = speed
+        self.pause = pause
+        self.rGen = RandomState(seed)
+        self.targetX = None
+
+    def randomPoints(self, rows):
+        xOffset, yOffset, width, length = cellBounds(self.networks, rows, self.network)
+        return xOffset + self.rGen.rand(len(rows)) * width, yOffset + self.rGen.rand(len(rows)) * length
+
+    def step(self, state):
+        d = state.deployment
+        if self.targetX is None:
+            self.network = d.network
+            self.rows = concatenate(d.mobileStationRows)
+            self.targetX, self.targetY = self.randomPoints(self.rows)
+            self.waiting = zeros(len(self.rows), dtype=int)
+        moving = state.active[self.rows] & (self.waiting == 0)
+        self.waiting[~moving & (self.waiting > 0)] -= 1
+        rows = self.rows[moving]
+        dx = self.targetX[moving] - d.x[rows]
+        dy = self.targetY[moving] - d.y[rows]
+        distance = sqrt(dx**2 + dy**2)
+        arrived = distance <= self.speed
+        scale = where(arrived, 1.0, self.speed / maximum(distance, 1e-12))
+        d.x[rows] += dx * scale
+        d.y[rows] += dy * scale
+        state.moveStations(rows)
+
+        arrivedIndex = flatnonzero(moving)[arrived]
+        self.waiting[arrivedIndex] = self.pause
+        self.targetX[arrivedIndex], self.targetY[arrivedIndex] = self.randomPoints(self.rows[arrivedIndex])
+        return rows
+
+# Arrival and departure of mobile stations. Every step each present mobile
+# station leaves with departureProbability, keeping at least one per network,
+# and each slot left empty is taken by a new station at a random point of the
+# cell with arrivalProbability. Networks keep the number of slots they were
+# created with.
+class Churn:
+    def __init__(self, networks, departureProbability, arrivalProbability, seed = None):
+        self.networks = networks
+        self.departureProbability = departureProbability
+        self.arrivalProbability = arrivalProbability
+        self.rGen = RandomState(seed)
+
+    def step(self, state):
+        d = state.deployment
+        rows = concatenate(d.mobileStationRows)
+        draw = self.rGen.rand(len(rows))
+        departing = rows[state.active[rows] & (draw < self.departureProbability)]
+        arriving = rows[~state.active[rows] & (draw < self.arrivalProbability)]
+        for row in departing:
+            if state.active[d.mobileStationRows[d.network[row]]].sum() > 1:
+                state.setPower(row, 0.0, d.snrFloor[row])
+                state.setBufferProbability(row, 0.0)
+                state.setActive(row, False)
+        xOffset, yOffset, width, length = cellBounds(self.networks, arriving, d.network)
+        d.x[arriving] = xOffset + self.rGen.rand(len(arriving)) * width
+        d.y[arriving] = yOffset + self.rGen.rand(len(arriving)) * length
+        for row in arriving:
+            state.moveStation(row)
+            state.setPower(row, MS_INITIAL_POWER, MS_INITIAL_SNR_FLOOR)
+            state.setBufferProbability(row, MS_PROBABILITY_OF_NONEMPTY_BUFFER)
+            state.setActive(row, True)
+        return departing, arriving
@@ -1,4 +1,11 @@
 from powervariation_sim import *
+from batchSimulation import *
+from parallelRunner import *
+from streamingRecorder import *
+from resultStore import *
+from resultCache import *
+from profiling import Profile
+from plotting import Renderer, render
 from numpy import *
 import os
 import sys
@@ -6,52 +13,93 @@ import sys
 def testOdeAlgorithm(a, b, iRange, jRange,
                      width, length, xSpace, ySpace, 
                      c,
-                     n, isStandard, numIterations, mcIterations):
+                     n, isStandard, numIterations, mcIterations, batchSize = None, convergence = None,
+                     spillPrefix = None, store = None, profile = False, renderer = None, dtype = float, seed = None):
     
-    params = ' cellDim=' + str((a,b)) + ' networkDim=' + str((width, length)) \
-                + ' spacing=' + str((xSpace, ySpace)) + ' nodes=' + str(n) \
-                + ' iter=' + str(numIterations) + ' mcIter=' + str(mcIterations) \
-                + ' c=' + str(c)
+    params = odeParams(a, b, width, length, xSpace, ySpace, c, n, numIterations, mcIterations)
                 
     print("Testing ODE Algorithm with parameters:" + params)
+    profiler = Profile().enable() if profile else None
     
-    numNetworksToPlot = (iRange[1] + 1 - iRange[0]) * (jRange[1] + 1 - jRange[0])
-    
-    sumNormalisedThroughputTss = zeros([numNetworksToPlot, numIterations])
-    sumDataRateTss = zeros([numNetworksToPlot, numIterations])
-    sumApPowerTss = zeros([numNetworksToPlot, numIterations])
-    sumThroughputTss = zeros([numNetworksToPlot, numIterations])
-    sumUtilityTss = zeros([numNetworksToPlot, numIterations])
-    
+    # trial t is the deployment of trialSeed(seed, t), as with runPoints
+    if seed is None:
+        seed = newSeed()
+    writer = None
+    if store is not None:
+        writer = store.writer('ODE' + params, dict(algorithm='ODE', a=a, b=b, width=width, length=length, xSpace=xSpace, ySpace=ySpace,
+                                                   c=c, n=n, isStandard=isStandard, numIterations=numIterations, mcIterations=mcIterations,
+                                                   seed=seed, trialSeeds=map(lambda t: trialSeed(seed, t, mcIterations), range(mcIterations))), mcIterations)
+    recorder = StreamingRecorder(numIterations, spillPrefix, store = writer)
+    trials = monteCarloTrials(lambda t: createNetworks(a, b, width, length, xSpace, ySpace, n, isStandard, trialSeed(seed, t, mcIterations)),
+                              lambda networks, recordings: runPowerVariationAlgorithm(networks, numIterations, c, convergence, recordings),
+                              lambda batch: runBatchedPowerVariationAlgorithm(batch, numIterations, c, convergence, dtype = dtype),
+                              mcIterations, batchSize, recorder)
     for i in range(mcIterations):
         print("Running iteration " + str(i+1) + "/" + str(mcIterations))
-        networks = createNetworks(a, b, width, length, xSpace, ySpace, n, isStandard)        
-        recordings = runPowerVariationAlgorithm(networks, numIterations, c)
-        recordingsToPlot = filter(lambda r: inRange(r.index[0], iRange) and inRange(r.index[1], jRange), recordings)
-        
-        labels = map(lambda r: 'Network' + str(r.index), recordingsToPlot)
-        
-        sumNormalisedThroughputTss += array(map(lambda r: r.normalisedThroughput, recordingsToPlot))
-        sumDataRateTss += array(map(lambda r: r.dataRate, recordingsToPlot))
-        sumApPowerTss += array(map(lambda r: r.apPower, recordingsToPlot))
-        sumThroughputTss += array(map(lambda r: multiply(r.dataRate, r.normalisedThroughput), recordingsToPlot))
-        sumUtilityTss += array(map(lambda r: r.utility, recordingsToPlot))
-
-        
-    avgNormalisedThroughputTss = sumNormalisedThroughputTss / mcIterations
-    avgDataRateTss = sumDataRateTss / mcIterations
-    avgApPowerTss = sumApPowerTss / mcIterations
-    avgThroughputTss = sumThroughputTss / mcIterations
-    avgUtilityTss = sumUtilityTss / mcIterations
+        next(trials)
+    recorder.close()
+    
+    networksToPlot = recorder.networksInRange(iRange, jRange)
+    labels = ['Network' + str(index) for index, toPlot in zip(recorder.index, networksToPlot) if toPlot]
+    avgNormalisedThroughputTss, avgDataRateTss, avgApPowerTss, avgThroughputTss, avgUtilityTss = recorder.mean[:,networksToPlot]
     
+    render(renderer, plotOdeAlgorithm, params, [avgNormalisedThroughputTss, avgDataRateTss, avgApPowerTss, avgThroughputTss, avgUtilityTss], labels)
+    
+    if profiler is not None:
+        profiler.disable()
+        print(profiler.summary())
+        profiler.dump('figures/ODE Algorithm/' + params + '/profile.txt')
+        if writer is not None:
+            profiler.dump(os.path.join(writer.path, 'profile.txt'))
+
+def odeParams(a, b, width, length, xSpace, ySpace, c, n, numIterations, mcIterations):
+    return ' cellDim=' + str((a,b)) + ' networkDim=' + str((width, length)) \
+                + ' spacing=' + str((xSpace, ySpace)) + ' nodes=' + str(n) \
+                + ' iter=' + str(numIterations) + ' mcIter=' + str(mcIterations) \
+                + ' c=' + str(c)
+
+def plotOdeAlgorithm(params, averages, labels):
     figDir = 'figures/ODE Algorithm/' + params
-    os.makedirs(figDir)
+    if not os.path.isdir(figDir):
+        os.makedirs(figDir)
     
-    plotTimeseries(avgNormalisedThroughputTss, labels, 'Normalised Throughput', figDir + '/Normalised Throughput.png')
-    plotTimeseries(avgDataRateTss, labels, 'Data Rate', figDir + '/Data Rate.png')
-    plotTimeseries(avgApPowerTss, labels, 'AP Power', figDir + '/AP Power.png')
-    plotTimeseries(avgThroughputTss, labels, 'Throughput', figDir + '/Throughput.png')
-    plotTimeseries(avgUtilityTss, labels, 'Utility', figDir + '/Utility.png')
+    plotTimeseries(averages[0], labels, 'Normalised Throughput', figDir + '/Normalised Throughput.png')
+    plotTimeseries(averages[1], labels, 'Data Rate', figDir + '/Data Rate.png')
+    plotTimeseries(averages[2], labels, 'AP Power', figDir + '/AP Power.png')
+    plotTimeseries(averages[3], labels, 'Throughput', figDir + '/Throughput.png')
+    plotTimeseries(averages[4], labels, 'Utility', figDir + '/Utility.png')
+
+# re-plots the averages of a run kept in a ResultStore by testOdeAlgorithm
+def plotStoredOdeAlgorithm(run, iRange, jRange, renderer = None):
+    networksToPlot = run.networksInRange(iRange, jRange)
+    labels = ['Network' + str(index) for index, toPlot in zip(run.index, networksToPlot) if toPlot]
+    averages = map(lambda name: run.mean(name, networksToPlot), SERIES)
+    m = run.metadata
+    render(renderer, plotOdeAlgorithm, odeParams(m['a'], m['b'], m['width'], m['length'], m['xSpace'], m['ySpace'], m['c'], m['n'], m['numIterations'], run.numTrials),
+           averages, labels)
+
+# renders the figures of every testOdeAlgorithm run in a ResultStore, numWorkers
+# at a time
+def plotStoredRuns(store, iRange, jRange, numWorkers = 1):
+    renderer = Renderer(numWorkers)
+    for name in store.runs(algorithm='ODE'):
+        plotStoredOdeAlgorithm(store.run(name), iRange, jRange, renderer)
+    renderer.close()
+
+# testOdeAlgorithm for several values of c, with the trials of all values
+# spread over a process pool and the figures drawn by a Renderer. With a
+# ResultStore the series of every trial are kept in it, one run per value of c.
+def testOdeAlgorithmParallel(a, b, iRange, jRange,
+                             width, length, xSpace, ySpace,
+                             cValues,
+                             n, numIterations, mcIterations, seed = 0, numWorkers = None, cache = None, store = None):
+    points = map(lambda c: dict(a=a, b=b, iRange=iRange, jRange=jRange, width=width, length=length,
+                                xSpace=xSpace, ySpace=ySpace, n=n, numIterations=numIterations, c=c), cValues)
+    renderer = Renderer(numWorkers or cpu_count())
+    for point, averages in zip(points, runPoints(points, mcIterations, seed, numWorkers, cache, store)):
+        labels = map(lambda index: 'Network' + str(index), networksToPlot(point))
+        renderer.submit(plotOdeAlgorithm, odeParams(a, b, width, length, xSpace, ySpace, point['c'], n, numIterations, mcIterations), averages, labels)
+    renderer.close()
         
 
 if __name__ == '__main__':
@@ -66,9 +114,8 @@ if __name__ == '__main__':
     mcIter = int(sys.argv[7])
     
     cValues = [20, 30, 25, 15, 35, 40]
-    for c in cValues:
-        testOdeAlgorithm(a = 5, b = 4, iRange = [1,3], jRange = [1,2],
+    testOdeAlgorithmParallel(a = 5, b = 4, iRange = [1,3], jRange = [1,2],
                      width = width, length = length, xSpace = xSpace, ySpace = ySpace,
-                     c = c,
-                     n = n, isStandard = False, numIterations = numIter, mcIterations = mcIter)
+                     cValues = cValues,
+                     n = n, numIterations = numIter, mcIterations = mcIter, cache = ResultCache('cache'), store = ResultStore('results'))
 
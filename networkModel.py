@@ -50,6 +50,7 @@ class Recording:
         self.normalisedThroughput = []        
         self.dataRate = []
         self.utility = []
+        self.iterationsToConverge = None
         
     def addDataPoint(self, p, gr, S, r, u):
         self.apPower.append(p)
@@ -57,6 +58,11 @@ class Recording:
         self.normalisedThroughput.append(S)
         self.dataRate.append(r)
         self.utility.append(u)
+
+    # repeat the last data point up to numPoints, for runs that stopped early
+    def pad(self, numPoints):
+        for series in [self.apPower, self.apGain, self.normalisedThroughput, self.dataRate, self.utility]:
+            series.extend(series[-1:] * (numPoints - len(series)))
         
 
 AP_INITIAL_POWER = 0.1
@@ -101,16 +107,184 @@ def pathLoss(d):
   L = 20*log10(2400)+30*log10(dd) + 14 - 28
   return 1.0/(10.0**(L/10.0))
 
-def isCochannelInterference(interferingNode, receiver, whiteNoise):
-    receivedPower = interferingNode.p * pathLoss(distance(interferingNode, receiver))
+# same model as pathLoss, evaluated elementwise over an array of distances
+def pathLossArray(d):
+  L = 20*log10(2400)+30*log10(maximum(d, 1)) + 14 - 28
+  return 1.0/(10.0**(L/10.0))
+
+# Path gains between every pair of stations in a deployment, gain[i, j] being
+# the gain from station i to station j. The matrix only depends on positions,
+# so it is built once and rebuilt by update() only when a station has moved.
+# Subclasses that keep gains in another form pass dense=False and provide
+# their own update() and linkGains().
+# With dtype=float32 the gains and distances are computed in double precision
+# and stored in single precision, halving the memory of the matrices. The path
+# gains (about 1e-6 down to 1e-15) are well inside the float32 range, so only
+# the relative precision drops to about 6e-8 (see precisionCheck).
+class PathGainMatrix:
+    def __init__(self, stations, dense=True, dtype=float):
+        self.stations = list(stations)
+        self.dtype = dtype
+        self.rows = dict((id(s), i) for i, s in enumerate(self.stations))
+        self.gainPositions = None
+        if dense:
+            self.update()
+
+    def positions(self):
+        return array([s.x for s in self.stations], dtype=float), array([s.y for s in self.stations], dtype=float)
+
+    def update(self):
+        x, y = self.positions()
+        if self.gainPositions is not None and array_equal(x, self.gainPositions[0]) and array_equal(y, self.gainPositions[1]):
+            return False
+        self.gainPositions = (x.copy(), y.copy())
+        distance = sqrt((x[:,newaxis] - x)**2 + (y[:,newaxis] - y)**2)
+        self.gain = pathLossArray(distance).astype(self.dtype, copy=False)
+        self.distance = distance.astype(self.dtype, copy=False)
+        return True
+
+    # gains of the stations in rows after they moved, an O(N) update of their
+    # rows and columns per station instead of rebuilding the matrix
+    def updateRows(self, rows):
+        x, y = self.positions()
+        d = sqrt((x[rows,newaxis] - x)**2 + (y[rows,newaxis] - y)**2)
+        self.distance[rows,:] = d
+        self.distance[:,rows] = d.T
+        self.gain[rows,:] = pathLossArray(d)
+        self.gain[:,rows] = self.gain[rows,:].T
+        self.gainPositions[0][rows] = x[rows]
+        self.gainPositions[1][rows] = y[rows]
+
+    def row(self, station):
+        return self.rows[id(station)]
+
+    # stations may already be given as an array of rows or a boolean mask
+    def rowsOf(self, stations):
+        if isinstance(stations, ndarray):
+            if stations.dtype == bool:
+                return flatnonzero(stations)
+            return stations
+        return array([self.row(s) for s in stations], dtype=int)
+
+    def attribute(self, name, rows):
+        return array([getattr(self.stations[i], name) for i in rows], dtype=float)
+
+    # gains from the transmitters in rows to one receiver, along with the rows
+    # they belong to
+    def linkGains(self, rows, receiverRow):
+        return rows, self.gain[rows, receiverRow]
+
+STATION_FIELDS = ['x', 'y', 'p', 'q', 'gr', 'snrFloor']
+MEMORY_FIELDS = ['prevU', 'uRef', 'prevUref', 'prevState', 'iterations']
+
+# attribute of a station view which reads and writes one element of the
+# corresponding deployment array
+class ArrayField(object):
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, view, owner):
+        if view is None:
+            return self
+        return getattr(view.deployment, self.name)[view.row]
+
+    def __set__(self, view, value):
+        getattr(view.deployment, self.name)[view.row] = value
+
+class MemoryView(object):
+    prevU = ArrayField('prevU')
+    uRef = ArrayField('uRef')
+    prevUref = ArrayField('prevUref')
+    prevState = ArrayField('prevState')
+    iterations = ArrayField('iterations')
+
+    def __init__(self, deployment, row):
+        self.deployment = deployment
+        self.row = row
+
+class StationView(object):
+    x = ArrayField('x')
+    y = ArrayField('y')
+    p = ArrayField('p')
+    q = ArrayField('q')
+    gr = ArrayField('gr')
+    snrFloor = ArrayField('snrFloor')
+
+    def __init__(self, deployment, row):
+        self.deployment = deployment
+        self.row = row
+        self.memory = MemoryView(deployment, row)
+
+# Struct-of-arrays form of a list of networks. Station attributes, the network
+# each station belongs to and the controller memory are held in contiguous
+# arrays, and the stations of the networks are replaced by views onto those
+# arrays, so code written against Network and Station keeps working.
+# Stations added to a network afterwards are not part of the deployment.
+class Deployment(PathGainMatrix):
+    def __init__(self, networks, dense=True, dtype=float):
+        stations = reduce(lambda x,y: x+y, map(allStations, networks))
+        for name in STATION_FIELDS:
+            setattr(self, name, array([getattr(s, name) for s in stations], dtype=float))
+        for name in MEMORY_FIELDS:
+            setattr(self, name, array([getattr(s.memory, name, 0) for s in stations], dtype=float))
+        self.network = array([j for j in range(len(networks)) for s in allStations(networks[j])], dtype=int)
+        self.networks = networks
+        self.numNetworks = len(networks)
+        self.accessPointRows = []
+        self.mobileStationRows = []
+        views = map(lambda row: StationView(self, row), range(len(stations)))
+        row = 0
+        for network in networks:
+            numStations = len(network.mobileStations)
+            network.mobileStations = views[row:row + numStations]
+            network.accessPoint = views[row + numStations]
+            self.mobileStationRows.append(arange(row, row + numStations))
+            self.accessPointRows.append(row + numStations)
+            row += numStations + 1
+        PathGainMatrix.__init__(self, views, dense, dtype)
+
+    def positions(self):
+        return self.x, self.y
+
+    def row(self, station):
+        return station.row
+
+    def attribute(self, name, rows):
+        return getattr(self, name)[rows]
+
+    def networkStations(self, j):
+        return self.network == j
+
+    def otherStations(self, j):
+        return self.network != j
+
+def linkGain(transmitter, receiver, gains=None):
+    if gains is None:
+        return pathLoss(distance(transmitter, receiver))
+    rows, linkGains = gains.linkGains(gains.rowsOf([transmitter]), gains.row(receiver))
+    return linkGains.sum()
+
+# received power at the receiver from each of the transmitting nodes, together
+# with which of those would be decoded as co-channel rather than interference
+def receivedPowers(transmitters, receiver, whiteNoise, gains):
+    rows, linkGains = gains.linkGains(gains.rowsOf(transmitters), gains.row(receiver))
+    powers = gains.attribute('p', rows) * linkGains * receiver.gr
+    return rows, powers, powers / whiteNoise > receiver.snrFloor
+
+def isCochannelInterference(interferingNode, receiver, whiteNoise, gains=None):
+    receivedPower = interferingNode.p * linkGain(interferingNode, receiver, gains)
     return receivedPower * receiver.gr / whiteNoise > receiver.snrFloor
     
-def receivedInterferencePower(interferingNode, receiver, whiteNoise):
-    receivedPower = interferingNode.p * pathLoss(distance(interferingNode, receiver))
+def receivedInterferencePower(interferingNode, receiver, whiteNoise, gains=None):
+    receivedPower = interferingNode.p * linkGain(interferingNode, receiver, gains)
     return receivedPower * receiver.gr
     
 # function calculates SINR for station
-def sinr(transmitter, receiver, interferingNodes, whiteNoise):  
+def sinr(transmitter, receiver, interferingNodes, whiteNoise, gains=None):  
+    if gains is not None:
+        signalVolume = transmitter.p * linkGain(transmitter, receiver, gains)
+        rows, powers, isCochannel = receivedPowers(interferingNodes, receiver, whiteNoise, gains)
+        return signalVolume * receiver.gr / (powers[~isCochannel].sum() + whiteNoise)
     signalVolume = transmitter.p * pathLoss(distance(transmitter, receiver))
     interchannelInterferingNodes = filter(lambda node: not isCochannelInterference(node, receiver, whiteNoise), interferingNodes)
     interferenceVolume = sum(map(lambda node: node.p * pathLoss(distance(node, receiver)), interchannelInterferingNodes))
@@ -134,13 +308,23 @@ def estimateTransmissionProbability(windowSize, q):
 def allStations(network):
     return network.mobileStations + [network.accessPoint]
     
-def probabilityOfExactlyOneTransmission(network, interferingNodes):
+def probabilityOfExactlyOneTransmission(network, interferingNodes, gains=None):
     stations = allStations(network)
     pSuccessfulTransmissions = []
     numsCochannelStations = []
+    if gains is not None:
+        interferingNodes = gains.rowsOf(interferingNodes)
     for station in stations:
         tauI = estimateTransmissionProbability(CW_MIN, station.q)
         otherStationsOnTheSameNetwork = filter(lambda s: s!=station, stations)
+        if gains is not None:
+            rows, powers, isCochannel = receivedPowers(interferingNodes, station, WHITE_NOISE, gains)
+            cochannelTaus = estimateTransmissionProbability(CW_MIN, gains.attribute('q', rows[isCochannel]))
+            numsCochannelStations.append(count_nonzero(isCochannel))
+            tauJs = map(lambda s: estimateTransmissionProbability(CW_MIN, s.q), otherStationsOnTheSameNetwork)
+            pSuccessfulTransmissionI = tauI * product(map(lambda tauJ: 1-tauJ, tauJs)) * product(1 - cochannelTaus)
+            pSuccessfulTransmissions.append(pSuccessfulTransmissionI)
+            continue
         cochannelInterferingStations = filter(lambda s: isCochannelInterference(s, station, WHITE_NOISE), interferingNodes)
         numsCochannelStations.append(len(cochannelInterferingStations))
         allCochannelStations = otherStationsOnTheSameNetwork + cochannelInterferingStations
@@ -157,52 +341,112 @@ def probabilityOfAtLeastOneTransmission(network):
     taus = map(lambda station: estimateTransmissionProbability(CW_MIN, station.q), stations)
     return 1 - product(map(lambda tau: 1-tau, taus))
     
-def normalisedNetworkThroughput(network, interferingNodes, expectedPayload):
+def normalisedNetworkThroughput(network, interferingNodes, expectedPayload, gains=None):
+    pExactlyOneTransmission = probabilityOfExactlyOneTransmission(network, interferingNodes, gains)
+    pAtLeastOneTransmission = probabilityOfAtLeastOneTransmission(network)
+    return dcfThroughput(pExactlyOneTransmission, pAtLeastOneTransmission, expectedPropagationDelay(network), expectedPayload)
+
+def dcfThroughput(pExactlyOneTransmission, pAtLeastOneTransmission, propagationDelay, expectedPayload):
+    pSuccessfulTransmission = pExactlyOneTransmission / pAtLeastOneTransmission
+    averageSlotTime = dcfSlotTime(pExactlyOneTransmission, pAtLeastOneTransmission, propagationDelay, expectedPayload)
+    #Capacity - probability of successful transmission * expected payload over slot time
+    return pSuccessfulTransmission*pAtLeastOneTransmission*delay(expectedPayload) / averageSlotTime
+
+def dcfSlotTime(pExactlyOneTransmission, pAtLeastOneTransmission, propagationDelay, expectedPayload):
     #Assuming basic DCF with RTS/CTS with fixed packet sizes
     emptySlotTime = SLOT_TIME
-    timeBusyCollision = expectedPropagationDelay(network)+DIFS+delay(RTS)
-    timeBusySuccessful = delay(RTS)+delay(CTS)+delay(ACK)+delay(expectedPayload)+4*expectedPropagationDelay(network)+3*SIFS+DIFS
-    pExactlyOneTransmission = probabilityOfExactlyOneTransmission(network, interferingNodes)
-    pAtLeastOneTransmission = probabilityOfAtLeastOneTransmission(network)
+    timeBusyCollision = propagationDelay+DIFS+delay(RTS)
+    timeBusySuccessful = delay(RTS)+delay(CTS)+delay(ACK)+delay(expectedPayload)+4*propagationDelay+3*SIFS+DIFS
     pSuccessfulTransmission = pExactlyOneTransmission / pAtLeastOneTransmission
-    averageSlotTime = ( (1-pAtLeastOneTransmission)*emptySlotTime + \
+    return ( (1-pAtLeastOneTransmission)*emptySlotTime + \
         pAtLeastOneTransmission*pSuccessfulTransmission*timeBusySuccessful+ \
         pAtLeastOneTransmission*(1-pSuccessfulTransmission)*timeBusyCollision)
-    #Capacity - probability of successful transmission * expected payload over slot time
-    return pSuccessfulTransmission*pAtLeastOneTransmission*delay(expectedPayload) / averageSlotTime
+
+# Array versions of the DCF model, evaluating every network of a deployment in
+# one pass. The functions above remain the reference implementation; arrays
+# may carry a leading trial axis.
+
+# sum of values[..., k] over the stations k of each network, with bincount so
+# that no stations x networks matrix is built
+def networkSums(values, network, numNetworks):
+    values = asarray(values, dtype=float)
+    if values.ndim == 1:
+        return bincount(network, values, numNetworks)
+    flat = values.reshape(-1, values.shape[-1])
+    bins = (arange(len(flat))[:,newaxis] * numNetworks + network).ravel()
+    return bincount(bins, flat.ravel(), len(flat) * numNetworks).reshape(values.shape[:-1] + (numNetworks,))
+
+# expectedPropagationDelay of every network
+def propagationDelays(deployment):
+    return stack(map(lambda ap, ms: deployment.distance[...,ap,ms].mean(axis=-1, dtype=float) / C,
+                     deployment.accessPointRows, deployment.mobileStationRows), axis=-1)
+
+# cochannel[..., i, k] is true when station k decodes station i of another
+# network as co-channel
+def cochannelMatrix(deployment, whiteNoise=WHITE_NOISE):
+    received = deployment.p[...,:,newaxis] * deployment.gain * deployment.gr[...,newaxis,:]
+    otherNetwork = deployment.network[:,newaxis] != deployment.network
+    return otherNetwork & (received / whiteNoise > deployment.snrFloor[...,newaxis,:])
+
+# Per-station probability of a successful transmission, average slot time and
+# normalised throughput of each network. cochannelLogIdle is, per station, the
+# log-probability that none of its co-channel stations in other networks
+# transmits.
+def dcfNetworks(tau, network, numNetworks, cochannelLogIdle, propagationDelay, expectedPayload):
+    logIdle = log(1 - tau)
+    networkLogIdle = networkSums(logIdle, network, numNetworks)
+    pSuccessfulTransmissions = tau * exp(networkLogIdle[...,network] - logIdle + cochannelLogIdle)
+    pExactlyOneTransmission = networkSums(pSuccessfulTransmissions, network, numNetworks)
+    pAtLeastOneTransmission = 1 - exp(networkLogIdle)
+    averageSlotTime = dcfSlotTime(pExactlyOneTransmission, pAtLeastOneTransmission, propagationDelay, expectedPayload)
+    throughput = dcfThroughput(pExactlyOneTransmission, pAtLeastOneTransmission, propagationDelay, expectedPayload)
+    return pSuccessfulTransmissions, averageSlotTime, throughput
+
+def networkThroughputs(deployment, expectedPayload, cochannel=None):
+    if cochannel is None:
+        cochannel = cochannelMatrix(deployment)
+    tau = estimateTransmissionProbability(CW_MIN, deployment.q)
+    cochannelLogIdle = (log(1 - tau)[...,:,newaxis] * cochannel).sum(axis=-2)
+    return dcfNetworks(tau, deployment.network, deployment.numNetworks, cochannelLogIdle,
+                       propagationDelays(deployment), expectedPayload)[2]
     
-def getAverageDataRate20MHZ(network, interferingNodes):
-    dataRate=0
-    MCSToDataRateSwitcher = {
-        00: 0,
-        0: 6.5,
-        1: 13,
-        2: 19.5,
-        3: 26,
-        4: 39,
-        5: 52,
-        6: 58.5,
-        7: 65
-    }
-    for station in network.mobileStations:
-        snr=sinr(network.accessPoint, station, interferingNodes, WHITE_NOISE)
-        if snr<3:
-            mcs=00;
-        elif snr<5:
-            mcs=0
-        elif snr<9:
-            mcs=1
-        elif snr<11:
-            mcs=2
-        elif snr<15:
-            mcs=3
-        elif snr<18:
-            mcs=4            
-        elif snr<20:
-            mcs=5
-        elif snr<25:
-            mcs=6            
-        else:
-            mcs=7
-        dataRate+=MCSToDataRateSwitcher.get(mcs, 65)
-    return dataRate/len(network.mobileStations)
\ No newline at end of file
+def getAverageDataRate20MHZ(network, interferingNodes, gains=None, mcsTable=None):
+    mcsTable = mcsTable or MCS_TABLE_20MHZ
+    if gains is not None:
+        interferingNodes = gains.rowsOf(interferingNodes)
+    snrs = map(lambda station: sinr(network.accessPoint, station, interferingNodes, WHITE_NOISE, gains), network.mobileStations)
+    return mean(mcsTable.dataRate(array(snrs)))
+
+# SINR to MCS/data rate lookup. A SINR below thresholds[0] selects mcs[0] and
+# rates[0], one in [thresholds[k-1], thresholds[k]) selects entry k and
+# anything from the last threshold up the last entry, so thresholds has one
+# element fewer than mcs and rates.
+class McsTable:
+    def __init__(self, thresholds, mcs, rates):
+        self.thresholds = array(thresholds, dtype=float)
+        self.mcs = array(mcs, dtype=int)
+        self.rates = array(rates, dtype=float)
+
+    def entry(self, snr):
+        return searchsorted(self.thresholds, snr, side='right')
+
+    def lookup(self, snr):
+        k = self.entry(snr)
+        return self.mcs[k], self.rates[k]
+
+    def dataRate(self, snr):
+        return self.rates[self.entry(snr)]
+
+# table stored as a JSON object with thresholds, mcs and rates lists, e.g. for
+# 40 MHz or 802.11ac channels
+def loadMcsTable(fileName):
+    import json
+    with open(fileName) as f:
+        table = json.load(f)
+    return McsTable(table['thresholds'], table['mcs'], table['rates'])
+
+# 802.11n, 20 MHz, data rates in Mbit/s. SINRs below 3 get the MCS 0 rate as
+# in the original if/elif ladder, where the "no MCS" key 00 was the same as 0.
+MCS_TABLE_20MHZ = McsTable(thresholds = [3, 5, 9, 11, 15, 18, 20, 25],
+                           mcs = [0, 0, 1, 2, 3, 4, 5, 6, 7],
+                           rates = [6.5, 6.5, 13, 19.5, 26, 39, 52, 58.5, 65])
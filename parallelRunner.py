@@ -0,0 +1,105 @@
+from numpy import *
+from multiprocessing import Pool, cpu_count
+from powervariation_sim import *
+from random import Random
+
+# Runs the Monte Carlo trials of a list of parameter points across a process
+# pool. A point is a dict holding the createNetworks arguments (a, b, width,
+# length, xSpace, ySpace, n), iRange/jRange, numIterations and either c for the
+# ODE algorithm or maxPower/powerCost for proportional control. Optional
+# powerTolerance/utilityTolerance entries stop each trial once it converges,
+# and synchronous=True updates all access points at once. A powerCutoff entry
+# evaluates only the links received above it (CulledDeployment).
+# Trial t of every point uses the deployment seeded with trialSeed(seed, t), so
+# all points are compared on the same deployments, and the per-trial results
+# are summed in the parent in job order, which makes the averages bit-identical
+# whatever the number of workers.
+
+def trialSeed(seed, trial, mcIterations):
+    return seed * mcIterations + trial
+
+# a seed for a run not given one, recorded with its results so that the run can
+# be repeated
+def newSeed():
+    return Random().randint(0, 2**31 - 1)
+
+# indexes of all the networks of a point, in the order of createNetworks
+def networkIndexes(point):
+    return [(i,j) for i in range(point['a']) for j in range(point['b'])]
+
+def networksToPlot(point):
+    return filter(lambda index: inRange(index[0], point['iRange']) and inRange(index[1], point['jRange']), networkIndexes(point))
+
+# name and metadata of the run of a point in a resultStore.ResultStore, the
+# metadata holding the createNetworks arguments like those of the serial
+# drivers, so that monteCarlo.plotStoredRuns draws them as well
+def pointRunName(point):
+    return ('ODE' if 'c' in point else 'ProportionalControl') + ' ' + ' '.join(map(lambda key: key + '=' + str(point[key]), sorted(point)))
+
+def pointRunMetadata(point, mcIterations, seed):
+    return dict(point, algorithm='ODE' if 'c' in point else 'ProportionalControl', isStandard=False, mcIterations=mcIterations,
+                seed=seed, trialSeeds=map(lambda t: trialSeed(seed, t, mcIterations), range(mcIterations)))
+
+# normalised throughput, data rate, AP power, throughput and utility time series
+# of all networks, for one trial
+def runTrial(job):
+    point, seed = job
+    networks = createNetworks(point['a'], point['b'], point['width'], point['length'],
+                              point['xSpace'], point['ySpace'], point['n'], False, seed)
+    convergence = None
+    tolerances = dict((key, point[key]) for key in ['powerTolerance', 'utilityTolerance'] if key in point)
+    if tolerances:
+        convergence = ConvergenceDetector(**tolerances)
+    if 'c' in point:
+        recordings = runPowerVariationAlgorithm(networks, point['numIterations'], point['c'], convergence,
+                                                synchronous = point.get('synchronous', False), powerCutoff = point.get('powerCutoff'))
+    else:
+        recordings = runPowerVariationAlgorithmControl(networks, point['numIterations'], point['maxPower'], point['powerCost'], convergence,
+                                                       synchronous = point.get('synchronous', False), powerCutoff = point.get('powerCutoff'))
+    return array([map(lambda r: r.normalisedThroughput, recordings),
+                  map(lambda r: r.dataRate, recordings),
+                  map(lambda r: r.apPower, recordings),
+                  map(lambda r: multiply(r.dataRate, r.normalisedThroughput), recordings),
+                  map(lambda r: r.utility, recordings)])
+
+# averaged time series of the networks in range of each point, indexed
+# [series, network, iteration] in the order returned by runTrial. With a
+# ResultCache the points already run with the same mcIterations and seed are
+# read from it and only the others are run, then stored. With a
+# resultStore.ResultStore the series of every trial of the points run are
+# also written to it, one run per point named by pointRunName, and a point is
+# only read from the cache once its run is in the store.
+def runPoints(points, mcIterations, seed = 0, numWorkers = None, cache = None, store = None):
+    averages = [None] * len(points)
+    if cache is not None:
+        averages = map(lambda point: cache.get(dict(point=point, mcIterations=mcIterations), seed)
+                       if store is None or store.hasRun(pointRunName(point)) else None, points)
+    missing = [k for k in range(len(points)) if averages[k] is None]
+    jobs = [(points[k], trialSeed(seed, t, mcIterations)) for k in missing for t in range(mcIterations)]
+    if numWorkers == 1:
+        results = map(runTrial, jobs)
+    elif jobs:
+        pool = Pool(numWorkers or cpu_count())
+        results = pool.imap(runTrial, jobs, max(1, len(jobs) / (4 * (numWorkers or cpu_count()))))
+    else:
+        results = []
+    sums = dict()
+    writers = dict()
+    for k, result in zip([k for k in missing for t in range(mcIterations)], results):
+        if store is not None:
+            if k not in writers:
+                writers[k] = store.writer(pointRunName(points[k]), pointRunMetadata(points[k], mcIterations, seed), mcIterations)
+                writers[k].allocate(networkIndexes(points[k]), points[k]['numIterations'])
+            writers[k].addTrial(result)
+            if writers[k].count == mcIterations:
+                writers[k].close()
+        result = result[:,map(lambda index: index in networksToPlot(points[k]), networkIndexes(points[k]))]
+        sums[k] = result if k not in sums else sums[k] + result
+    if numWorkers != 1 and jobs:
+        pool.close()
+        pool.join()
+    for k in missing:
+        averages[k] = sums[k] / mcIterations
+        if cache is not None:
+            cache.put(dict(point=points[k], mcIterations=mcIterations), seed, averages[k])
+    return averages
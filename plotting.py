@@ -0,0 +1,82 @@
+from numpy import *
+from multiprocessing import Pool
+
+# Figures of the simulations. matplotlib is only imported by the first
+# function that draws, so the compute path (and every Monte Carlo worker)
+# never loads it. A Renderer draws the figures in a separate process while
+# the simulation carries on.
+
+def pyplot():
+    import matplotlib.pyplot as plt
+    return plt
+
+def plotNetworks(networks, width, length):
+    plt = pyplot()
+    graphWidth = 10.0
+    graphHeight = graphWidth * length / width
+    plt.figure(figsize=(graphWidth, graphHeight))
+    for network in networks:
+        plt.plot(map(lambda ms: ms.x, network.mobileStations), map(lambda ms: ms.y, network.mobileStations), 'bo')
+        plt.plot(network.accessPoint.x, network.accessPoint.y, 'rs')
+    plt.axis([0, width, 0, length])
+    plt.show()
+
+def plotTimeseries(timeseries, labels, title, fileName = None):
+    plt = pyplot()
+    time = range(len(timeseries[0]))
+    for i in range(len(timeseries)):
+        plt.plot(time, timeseries[i], label=labels[i])
+    avg = mean(timeseries, axis = 0)
+    plt.plot(avg, label='Average', c='black', ls='--', lw=2)
+    plt.title(title)
+    lgd = plt.legend(bbox_to_anchor=(1.05, 1), loc=2)
+    if fileName != None:
+        plt.savefig(fileName, bbox_extra_artists=(lgd,), bbox_inches='tight')
+    else:
+        plt.show()
+    plt.clf()
+    
+
+def plotRecordings(recordings):
+    normalisedThroughputTss = array(map(lambda r: r.normalisedThroughput, recordings))
+    dataRateTss = array(map(lambda r: r.dataRate, recordings))
+    apPowerTss = array(map(lambda r: r.apPower, recordings))
+    throughputTss = array(map(lambda r: multiply(r.dataRate, r.normalisedThroughput), recordings))      
+    utilityTss = array(map(lambda r: r.utility, recordings))
+    labels = map(lambda r: 'Network' + str(r.index), recordings)  
+    plotTimeseries(normalisedThroughputTss, labels, 'Normalised Throughput')
+    plotTimeseries(dataRateTss, labels, 'Data Rate')
+    plotTimeseries(apPowerTss, labels, 'AP Power')
+    plotTimeseries(throughputTss, labels, 'Throughput')
+    plotTimeseries(utilityTss, labels, 'Utility')
+
+# Runs plotting functions in a pool of rendering processes, which use the
+# non-interactive Agg backend so they can only save figures to files. The
+# functions and their arguments are pickled, so they have to be module level
+# functions given arrays or plain values. close() waits for the figures and
+# raises any error a rendering hit.
+def initialiseRenderer():
+    import matplotlib
+    matplotlib.use('Agg')
+
+class Renderer:
+    def __init__(self, numWorkers = 1):
+        self.pool = Pool(numWorkers, initialiseRenderer)
+        self.pending = []
+
+    def submit(self, function, *args):
+        self.pending.append(self.pool.apply_async(function, args))
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+        for result in self.pending:
+            result.get()
+        self.pending = []
+
+# draws with the renderer if there is one, otherwise right away
+def render(renderer, function, *args):
+    if renderer is None:
+        function(*args)
+    else:
+        renderer.submit(function, *args)
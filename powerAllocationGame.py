@@ -0,0 +1,258 @@
+from numpy import *
+from networkModel import pathLossArray
+import warnings
+
+# Array version of the ISM-band power allocation game. A system of n
+# transmitter/receiver pairs is described by its gain matrix, gain[..., j, k]
+# being the path gain from transmitter j to receiver k, and its power vector;
+# both may carry a leading trial axis so that many random systems are played
+# at once.
+
+# positions of numTrials systems of n pairs placed as by allocateSystem, the
+# random numbers being drawn in the same order
+def allocateSystems(numTrials, n):
+  u = random.rand(numTrials, n, 4)
+  transX = u[...,0]*100
+  transY = u[...,1]*100
+  recX = transX + u[...,2]*40
+  recY = transY + u[...,3]*40
+  return transX, transY, recX, recY
+
+def gainMatrices(transX, transY, recX, recY):
+  d = sqrt((transX[...,:,newaxis] - recX[...,newaxis,:])**2 + (transY[...,:,newaxis] - recY[...,newaxis,:])**2)
+  return pathLossArray(d)
+
+def directGains(gain):
+  return diagonal(gain, axis1=-2, axis2=-1)
+
+# interference at every receiver from all the other transmitters
+def interference(gain, p):
+  return (gain * p[...,:,newaxis]).sum(axis=-2) - directGains(gain)*p
+
+def sinrs(gain, p, sigmaSquared):
+  return directGains(gain)*p/(interference(gain, p) + sigmaSquared)
+
+def systemCapacities(gain, p, sigmaSquared):
+  return log2(1 + sinrs(gain, p, sigmaSquared)).mean(axis=-1)
+
+# nextPowerConfigurationSequential: users update in turn (Gauss-Seidel), each
+# seeing the powers already updated in this sweep
+def nextPowerConfigurationSequential(gain, p, sigmaSquared, pMax, c):
+  p = p.copy()
+  for i in range(p.shape[-1]):
+    interf = (gain[...,:,i]*p).sum(axis=-1) - gain[...,i,i]*p[...,i]
+    sinr = gain[...,i,i]*p[...,i]/(interf + sigmaSquared)
+    newP = 1.0/c - 1.0/sinr*p[...,i]
+    p[...,i] = clip(where(newP <= 0, 1e-10, newP), None, pMax)
+  return p
+
+# Plays the game on every system for numIterations sweeps. With a
+# ConvergenceDetector, systems whose powers have settled keep them from then
+# on and the loop stops once all have.
+def playGame(gain, p, sigmaSquared, pMax, c, numIterations, convergence = None):
+  for iter in range(numIterations):
+    newP = nextPowerConfigurationSequential(gain, p, sigmaSquared, pMax, c)
+    if convergence is not None:
+      newP = where(asarray(convergence.converged)[...,newaxis], p, newP)
+      if convergence.update(newP):
+        p = newP
+        break
+    p = newP
+  if convergence is not None:
+    convergence.finish()
+  return p
+
+# Best response of every user to the powers of the others, as in
+# nextPowerConfigurationSequential but all from the same p. Before the box
+# [1e-10, pMax] it is affine in p: 1/c - (interference + sigma^2)/g_ii.
+def bestResponses(gain, p, sigmaSquared, pMax, c):
+  newP = 1.0/c - (interference(gain, p) + sigmaSquared)/directGains(gain)
+  return clip(where(newP <= 0, 1e-10, newP), None, pMax)
+
+# Jacobian of the unclipped best responses, d newP_i / d p_j = -g_ji / g_ii
+def bestResponseJacobian(gain):
+  n = gain.shape[-1]
+  jacobian = -swapaxes(gain, -1, -2) / directGains(gain)[...,:,newaxis]
+  jacobian[...,arange(n),arange(n)] = 0
+  return jacobian
+
+# Solution z of the linear complementarity problem w = q + A z >= 0, z >= 0,
+# z.w = 0 by Lemke's method, or None if it ends on a ray
+def lemke(A, q, maxPivots = 1000):
+  n = len(q)
+  if (q >= 0).all():
+    return zeros(n)
+  # columns w, z, the artificial variable z0 and q, with w = q + A z + z0
+  T = hstack([eye(n), -A, -ones((n, 1)), q[:,newaxis]])
+  basis = range(n)
+  r = argmin(q)
+  entering = 2*n
+  for pivot in range(maxPivots):
+    T[r] /= T[r,entering]
+    T -= outer(T[:,entering], T[r]) * (arange(n) != r)[:,newaxis]
+    leaving = basis[r]
+    basis[r] = entering
+    if leaving == 2*n:
+      solution = zeros(2*n + 1)
+      solution[basis] = T[:,-1]
+      return solution[n:2*n]
+    entering = leaving + n if leaving < n else leaving - n
+    column = T[:,entering]
+    rows = nonzero(column > 1e-12 * abs(column).max())[0]
+    if len(rows) == 0:
+      return None
+    r = rows[argmin(T[rows,-1] / column[rows])]
+  return None
+
+# Equilibrium of one system found directly by Lemke's method. With
+# K_ij = g_ji/g_ii the best responses before the box are r - K p,
+# r = 1/c - sigma^2/g_ii, so with M = I + K the equilibrium p in [l, u] has
+# (M p - r)_i >= 0 where p_i = l, <= 0 where p_i = u and = 0 in between.
+# x = p - l and v = max(r - M p, 0) make it the complementarity problem of
+# A = [[M, I], [-I, 0]] and q = [M l - r, u - l]. As K >= 0, A is
+# copositive-plus, and an equilibrium always exists, so Lemke's method ends on
+# one rather than on a ray (barring rounding). The rounding of the pivots is
+# then taken out by a Newton step on the active set found. Returns None if
+# Lemke's method fails.
+def lemkeEquilibrium(gain, sigmaSquared, pMax, c):
+  n = gain.shape[-1]
+  M = eye(n) - bestResponseJacobian(gain)
+  r = 1.0/c - sigmaSquared/directGains(gain)
+  lower = 1e-10*ones(n)
+  A = vstack([hstack([M, eye(n)]), hstack([-eye(n), zeros((n, n))])])
+  z = lemke(A, concatenate([M.dot(lower) - r, pMax - lower]))
+  if z is None:
+    return None
+  p = lower + z[:n]
+  unclipped = r - (M - eye(n)).dot(p)
+  free = abs(unclipped - 0.5*pMax) < 0.5*pMax
+  J = eye(n) - free[:,newaxis] * bestResponseJacobian(gain)
+  step = linalg.solve(J, bestResponses(gain, p, sigmaSquared, pMax, c) - p)
+  return clip(p + step, 1e-10, pMax)
+
+# One iteration of solveEquilibrium: a sweep of
+# nextPowerConfigurationSequential, which settles which users sit at a bound
+# of the box [1e-10, pMax], then, for the systems whose active set it left
+# unchanged, a Newton step. With the bounded users fixed the best responses
+# are affine, so solving (I - d newP/d p) step = bestResponses(p) - p on the
+# free users, with d newP_i/d p_j = -g_ji/g_ii, jumps to the equilibrium of
+# that active set. It is kept for the systems whose residual it cuts a
+# hundredfold, so a wrong guess of the active set never undoes the progress of
+# the sweeps. pMax and c broadcast against one user's powers, as in playGame.
+# Returns the powers and their residuals max|p - bestResponses(p)|.
+def equilibriumIteration(gain, p, sigmaSquared, pMax, c, tolerance):
+  n = gain.shape[-1]
+  userPMax = asarray(pMax)[...,newaxis]
+  userC = asarray(c)[...,newaxis]
+  free = lambda p: abs(1.0/userC - (interference(gain, p) + sigmaSquared)/directGains(gain) - 0.5*userPMax) < 0.5*userPMax
+  previousFree = free(p)
+  p = nextPowerConfigurationSequential(gain, p, sigmaSquared, pMax, c)
+  response = bestResponses(gain, p, sigmaSquared, userPMax, userC)
+  residual = abs(p - response).max(axis=-1)
+  active = free(p)
+  settled = (active == previousFree).all(axis=-1)
+  if not settled.any():
+    return p, residual
+  J = eye(n) - active[...,:,newaxis] * bestResponseJacobian(gain)
+  step = linalg.solve(J, (response - p)[...,newaxis])[...,0]
+  newP = clip(p + step, 1e-10, userPMax)
+  newResidual = abs(newP - bestResponses(gain, newP, sigmaSquared, userPMax, userC)).max(axis=-1)
+  better = settled & (newResidual <= maximum(tolerance, 0.01 * residual))
+  return where(better[...,newaxis], newP, p), where(better, newResidual, residual)
+
+# Nash equilibrium of the game, the fixed point p = bestResponses(p), found by
+# up to maxIterations of equilibriumIteration. Once most systems have
+# converged the iterations only carry on the others. The few systems still
+# above tolerance after maxIterations, typically those where sequential play
+# cycles, are solved one at a time by lemkeEquilibrium, and any it leaves
+# above tolerance carry on with plain sweeps, up to fallbackSweeps of them.
+# A system may have several equilibria, and the Newton jump or Lemke's method
+# can land on another one than sequential play from the same start would
+# reach, so the powers are an equilibrium of the game but not necessarily the
+# one playGame converges to. Returns the powers, the residual
+# max|p - bestResponses(p)| of every system and the number of iterations
+# (fallback sweeps included).
+def solveEquilibrium(gain, p, sigmaSquared, pMax, c, tolerance = 1e-12, maxIterations = 50, fallbackSweeps = 200):
+  n = gain.shape[-1]
+  residual = abs(p - bestResponses(gain, p, sigmaSquared, asarray(pMax)[...,newaxis], asarray(c)[...,newaxis])).max(axis=-1)
+  p = broadcast_to(p, residual.shape + (n,)).copy()
+  # pMax, c and the gains of every system, for the subsets carried on
+  systemPMax = broadcast_to(asarray(pMax, dtype=float), residual.shape)
+  systemC = broadcast_to(asarray(c, dtype=float), residual.shape)
+  systemGain = broadcast_to(gain, residual.shape + (n, n))
+  for iteration in range(maxIterations):
+    unconverged = residual > tolerance
+    if not unconverged.any():
+      return p, residual, iteration
+    if unconverged.mean() > 0.5:
+      p, residual = equilibriumIteration(gain, p, sigmaSquared, pMax, c, tolerance)
+    else:
+      p[unconverged], residual[unconverged] = equilibriumIteration(systemGain[unconverged], p[unconverged], sigmaSquared,
+                                                                   systemPMax[unconverged], systemC[unconverged], tolerance)
+  unconverged = residual > tolerance
+  if not unconverged.any():
+    return p, residual, maxIterations
+  lemkeGain, lemkeP, lemkePMax, lemkeC = systemGain[unconverged], p[unconverged], systemPMax[unconverged], systemC[unconverged]
+  lemkeResidual = residual[unconverged]
+  for k in range(len(lemkeP)):
+    solution = lemkeEquilibrium(lemkeGain[k], sigmaSquared, lemkePMax[k], lemkeC[k])
+    if solution is None:
+      continue
+    solutionResidual = abs(solution - bestResponses(lemkeGain[k], solution, sigmaSquared, lemkePMax[k], lemkeC[k])).max()
+    if solutionResidual < lemkeResidual[k]:
+      lemkeP[k] = solution
+      lemkeResidual[k] = solutionResidual
+  p[unconverged] = lemkeP
+  residual[unconverged] = lemkeResidual
+  unconverged = residual > tolerance
+  sweptGain, sweptP, sweptPMax, sweptC = systemGain[unconverged], p[unconverged], systemPMax[unconverged], systemC[unconverged]
+  sweptResidual = residual[unconverged]
+  sweep = -1
+  for sweep in range(fallbackSweeps if unconverged.any() else 0):
+    sweptP = nextPowerConfigurationSequential(sweptGain, sweptP, sigmaSquared, sweptPMax, sweptC)
+    sweptResidual = abs(sweptP - bestResponses(sweptGain, sweptP, sigmaSquared, sweptPMax[:,newaxis], sweptC[:,newaxis])).max(axis=-1)
+    if (sweptResidual <= tolerance).all():
+      break
+  p[unconverged] = sweptP
+  residual[unconverged] = sweptResidual
+  return p, residual, maxIterations + sweep + 1
+
+# solveEquilibrium and the mask of the systems that reached the equilibrium,
+# warning about the others
+def equilibriumPowers(gain, p, sigmaSquared, pMax, c, tolerance = 1e-12):
+  p, residual, iterations = solveEquilibrium(gain, p, sigmaSquared, pMax, c, tolerance)
+  converged = residual <= tolerance
+  if not converged.all():
+    warnings.warn('%d of %d systems did not reach the equilibrium (largest residual %g) and are left out of the capacities'
+                  % ((~converged).sum(), converged.size, residual.max()))
+  return p, converged
+
+# With equilibrium the game is solved to a Nash equilibrium by
+# solveEquilibrium instead of being played for 10 sweeps, and the systems it
+# could not solve are left out of the average. Where a system has several
+# equilibria this may be another one than sequential play reaches, so the
+# capacities are not a drop-in replacement for the played ones.
+def averageSystemCapacity(pMax, c, numUsers, numSimulation = 1000, convergence = None, equilibrium = False):
+  sigmaSq = 1e-12
+  gain = gainMatrices(*allocateSystems(numSimulation, numUsers))
+  p = 0.1*ones((numSimulation, numUsers))
+  if equilibrium:
+    p, converged = equilibriumPowers(gain, p, sigmaSq, pMax, c)
+    return systemCapacities(gain, p, sigmaSq)[converged].mean()
+  p = playGame(gain, p, sigmaSq, pMax, c, 10, convergence)
+  return systemCapacities(gain, p, sigmaSq).mean()
+
+# Average system capacity for every combination of pMaxValues and cValues,
+# indexed [pMax, c]. All combinations are played on the same numSimulation
+# systems, whose geometry and gain matrices are only computed once; the sweep
+# points become an extra leading axis of the power vector.
+def systemCapacitySweep(pMaxValues, cValues, numUsers, numSimulation = 1000, convergence = None, equilibrium = False):
+  sigmaSq = 1e-12
+  gain = gainMatrices(*allocateSystems(numSimulation, numUsers))
+  pMax, c = meshgrid(asarray(pMaxValues, dtype=float), asarray(cValues, dtype=float), indexing='ij')
+  p = 0.1*ones(pMax.shape + (numSimulation, numUsers))
+  if equilibrium:
+    p, converged = equilibriumPowers(gain, p, sigmaSq, pMax[...,newaxis], c[...,newaxis])
+    return (systemCapacities(gain, p, sigmaSq) * converged).sum(axis=-1) / converged.sum(axis=-1)
+  p = playGame(gain, p, sigmaSq, pMax[...,newaxis], c[...,newaxis], 10, convergence)
+  return systemCapacities(gain, p, sigmaSq).mean(axis=-1)
@@ -1,45 +1,11 @@
 from numpy import *
-import matplotlib.pyplot as plt
 from networkModel import *
-
-    
-def plotNetworks(networks, width, length):
-    graphWidth = 10.0
-    graphHeight = graphWidth * length / width
-    plt.figure(figsize=(graphWidth, graphHeight))
-    for network in networks:
-        plt.plot(map(lambda ms: ms.x, network.mobileStations), map(lambda ms: ms.y, network.mobileStations), 'bo')
-        plt.plot(network.accessPoint.x, network.accessPoint.y, 'rs')
-    plt.axis([0, width, 0, length])
-    plt.show()
-
-def plotTimeseries(timeseries, labels, title, fileName = None):
-    time = range(len(timeseries[0]))
-    for i in range(len(timeseries)):
-        plt.plot(time, timeseries[i], label=labels[i])
-    avg = mean(timeseries, axis = 0)
-    plt.plot(avg, label='Average', c='black', ls='--', lw=2)
-    plt.title(title)
-    lgd = plt.legend(bbox_to_anchor=(1.05, 1), loc=2)
-    if fileName != None:
-        plt.savefig(fileName, bbox_extra_artists=(lgd,), bbox_inches='tight')
-    else:
-        plt.show()
-    plt.clf()
-    
-
-def plotRecordings(recordings):
-    normalisedThroughputTss = array(map(lambda r: r.normalisedThroughput, recordings))
-    dataRateTss = array(map(lambda r: r.dataRate, recordings))
-    apPowerTss = array(map(lambda r: r.apPower, recordings))
-    throughputTss = array(map(lambda r: multiply(r.dataRate, r.normalisedThroughput), recordings))      
-    utilityTss = array(map(lambda r: r.utility, recordings))
-    labels = map(lambda r: 'Network' + str(r.index), recordings)  
-    plotTimeseries(normalisedThroughputTss, labels, 'Normalised Throughput')
-    plotTimeseries(dataRateTss, labels, 'Data Rate')
-    plotTimeseries(apPowerTss, labels, 'AP Power')
-    plotTimeseries(throughputTss, labels, 'Throughput')
-    plotTimeseries(utilityTss, labels, 'Utility')
+from interferenceState import *
+from convergence import *
+from spatialIndex import CulledDeployment, CulledInterferenceState
+from plotting import plotNetworks, plotTimeseries, plotRecordings, pyplot
+from random import Random
+import heapq
 
 def setPowerLevelForAPs(networks, powerLevel):
     for j in range(len(networks)):
@@ -48,12 +14,12 @@ def setPowerLevelForAPs(networks, powerLevel):
 
 def findAverageThroughput(networks, iRange, jRange):
     networksInRange = filter(lambda n: inRange(n.index[0], iRange) and inRange(n.index[1], jRange), networks)
+    deployment = Deployment(networks)
     throughputs = []
     for network in networksInRange:
-        otherNetworks = filter(lambda n: n!= network, networks)
-        stationsFromOtherNetworks = reduce(lambda x,y: x+y, map(allStations, otherNetworks))
-        throughput = normalisedNetworkThroughput(network, stationsFromOtherNetworks, EXPECTED_PACKET_SIZE)   \
-                        * getAverageDataRate20MHZ(network, stationsFromOtherNetworks)
+        stationsFromOtherNetworks = deployment.otherStations(networks.index(network))
+        throughput = normalisedNetworkThroughput(network, stationsFromOtherNetworks, EXPECTED_PACKET_SIZE, deployment)   \
+                        * getAverageDataRate20MHZ(network, stationsFromOtherNetworks, deployment)
         throughputs.append(throughput)
     return mean(throughputs)
     
@@ -64,69 +30,209 @@ def testThroughputUsingPresetPower(networks, powerLevel, iRange, jRange):
 def inRange(number, r):
     return number>= r[0] and number <= r[1]
     
-def testAlternativeSchemes(networks, recordings, iRange, jRange):
-    
+# The final powers of the algorithm compared against static assignments of
+# the same geometry: every AP at the average or the maximum final power, and
+# the throughput-optimal static assignment over levels up to the maximum.
+def testAlternativeSchemes(networks, recordings, iRange, jRange, levels = None, sweeps = 1):
+    from staticPower import staticPowerThroughputs, optimalStaticPower
     recordingsInRange = filter(lambda r: inRange(r.index[0], iRange) and inRange(r.index[1], jRange), recordings)
-    averagePowerAtEnd = mean(map(lambda r: r.apPower, recordings))
+    averagePowerAtEnd = mean(map(lambda r: r.apPower[-1], recordings))
     averageThroughputAtEnd = mean(map(lambda r: r.normalisedThroughput[-1] * r.dataRate[-1], recordingsInRange))
     maxPowerAtEnd = max(map(lambda r: r.apPower[-1], recordings))
-    #Set all the APs to the average power value and test the average throughput at this point
-    avgThroughputUsingAvgPower= testThroughputUsingPresetPower(networks, averagePowerAtEnd, iRange, jRange)
-    avgThroughputUsingMaxPower = testThroughputUsingPresetPower(networks, maxPowerAtEnd, iRange, jRange)
+    #Set all the APs to the average and to the maximum power value and test the average throughput at these points
+    avgThroughputUsingAvgPower, avgThroughputUsingMaxPower = staticPowerThroughputs(networks, [averagePowerAtEnd, maxPowerAtEnd], iRange, jRange)
+    if levels is None:
+        levels = linspace(POWER_INCREMENT, maxPowerAtEnd, 20)
+    optimalPowers, optimalThroughput = optimalStaticPower(networks, levels, iRange, jRange, sweeps)
 
     print "Average throughput (for the 6 central networks) using power mgmt algorithm:", averageThroughputAtEnd
     print "Average throughput (for the 6 central networks) with all the APs using the average power from the power mgmt algorithm(",     \
             averagePowerAtEnd,"):", avgThroughputUsingAvgPower
     print "Average throughput (for the 6 central networks) with all the APs using the maximum power from the power mgmt algorithm(",    \
             maxPowerAtEnd,"):", avgThroughputUsingMaxPower
+    print "Average throughput (for the 6 central networks) with the optimal static AP powers(", optimalPowers, "):", optimalThroughput
+    return averageThroughputAtEnd, avgThroughputUsingAvgPower, avgThroughputUsingMaxPower, optimalThroughput
 
-def runPowerVariationAlgorithm(networks, numIterations, c = 20):
-    recordings = []
-    for network in networks:
-        recordings.append(Recording(network.index))
+# With a ConvergenceDetector the loop stops once the AP powers and utilities
+# have settled (or after its maxIterations) and the recordings are padded to
+# numIterations with their last data point. Recordings to write into can be
+# passed in, one per network.
+# The access points update their powers one after the other (Gauss-Seidel),
+# each seeing the powers already updated in the same iteration. With
+# synchronous every access point updates at once (Jacobi) from the S and r
+# measured for the recordings, so the model is only evaluated once per
+# iteration. mobility is a list of mobility.RandomWaypoint/Churn models that
+# change the topology between iterations. With a powerCutoff only the links
+# received above it are evaluated (see CulledDeployment for useful cutoffs).
+def runPowerVariationAlgorithm(networks, numIterations, c = 20, convergence = None, recordings = None,
+                               synchronous = False, mobility = None, powerCutoff = None):
+    if recordings is None:
+        recordings = []
+        for network in networks:
+            recordings.append(Recording(network.index))
+    deployment, state = deploymentState(networks, powerCutoff, 1.0)
         
     for i in range(numIterations):        
+        if i > 0 and mobility is not None:
+            for model in mobility:
+                model.step(state)
+        throughputs = state.throughputs(EXPECTED_PACKET_SIZE)
+        dataRates = state.dataRates()
         for j in range(len(networks)):
-            otherNetworks = networks[:j] + networks[j+1:]
-            stationsFromOtherNetworks = reduce(lambda x,y: x+y, map(allStations, otherNetworks))
-            S = normalisedNetworkThroughput(networks[j], stationsFromOtherNetworks, EXPECTED_PACKET_SIZE)
-            r = getAverageDataRate20MHZ(networks[j], stationsFromOtherNetworks)
+            S = throughputs[j]
+            r = dataRates[j]
             u = networks[j].accessPoint.memory.prevU
             recordings[j].addDataPoint(networks[j].accessPoint.p, networks[j].accessPoint.gr, S, r, u)
+        if convergence is not None and hasConverged(convergence, deployment):
+            break
+        if synchronous:
+            rows = deployment.accessPointRows
+            p = newApPowers(deployment, rows, throughputs, dataRates, c)
+            state.setPowers(rows, p, newApSnrFloor(p))
+            continue
         for j in range(len(networks)):
-            otherNetworks = networks[:j] + networks[j+1:]
-            stationsFromOtherNetworks = reduce(lambda x,y: x+y, map(allStations, otherNetworks))
-            networks[j].accessPoint.p = newApPower(networks[j], stationsFromOtherNetworks, c)
-            networks[j].accessPoint.snrFloor = newApSnrFloor(networks[j].accessPoint.p)
+            stationsFromOtherNetworks = deployment.otherStations(j)
+            p = newApPower(networks[j], stationsFromOtherNetworks, c, state)
+            state.setPower(networks[j].accessPoint.row, p, newApSnrFloor(p))
             
+    finishRecordings(recordings, numIterations, convergence)
     return recordings
     
-def runPowerVariationAlgorithmControl(networks, numIterations, maxPower, powerCost):
-    recordings = []
-    for network in networks:
-        recordings.append(Recording(network.index))
+def runPowerVariationAlgorithmControl(networks, numIterations, maxPower, powerCost, convergence = None, recordings = None,
+                                      synchronous = False, mobility = None, powerCutoff = None):
+    if recordings is None:
+        recordings = []
+        for network in networks:
+            recordings.append(Recording(network.index))
+    deployment, state = deploymentState(networks, powerCutoff, maxPower)
         
     for i in range(numIterations):        
+        if i > 0 and mobility is not None:
+            for model in mobility:
+                model.step(state)
+        throughputs = state.throughputs(EXPECTED_PACKET_SIZE)
+        dataRates = state.dataRates()
         for j in range(len(networks)):
-            otherNetworks = networks[:j] + networks[j+1:]
-            stationsFromOtherNetworks = reduce(lambda x,y: x+y, map(allStations, otherNetworks))
-            S = normalisedNetworkThroughput(networks[j], stationsFromOtherNetworks, EXPECTED_PACKET_SIZE)
-            r = getAverageDataRate20MHZ(networks[j], stationsFromOtherNetworks)
+            S = throughputs[j]
+            r = dataRates[j]
             u = networks[j].accessPoint.memory.prevU
             recordings[j].addDataPoint(networks[j].accessPoint.p, networks[j].accessPoint.gr, S, r, u)
+        if convergence is not None and hasConverged(convergence, deployment):
+            break
+        if synchronous:
+            rows = deployment.accessPointRows
+            p = newApPowersControl(deployment, rows, throughputs, dataRates, maxPower, powerCost)
+            state.setPowers(rows, p, newApSnrFloor(p))
+            continue
         for j in range(len(networks)):
-            otherNetworks = networks[:j] + networks[j+1:]
-            stationsFromOtherNetworks = reduce(lambda x,y: x+y, map(allStations, otherNetworks))
-            networks[j].accessPoint.p = newApPowerControl(networks[j], stationsFromOtherNetworks, maxPower, powerCost)
-            networks[j].accessPoint.snrFloor = newApSnrFloor(networks[j].accessPoint.p)
+            stationsFromOtherNetworks = deployment.otherStations(j)
+            p = newApPowerControl(networks[j], stationsFromOtherNetworks, maxPower, powerCost, state)
+            state.setPower(networks[j].accessPoint.row, p, newApSnrFloor(p))
             
+    finishRecordings(recordings, numIterations, convergence)
     return recordings  
     
 
+# Wake-up timers of the asynchronous scheduler: each returns the time until an
+# access point wakes again, drawn from rGen. runAsynchronous takes a factory
+# of them, given its own Random(seed), e.g.
+# wakeup = lambda rGen: jitteredWakeups(1.0, 0.2, rGen)
+def poissonWakeups(rate, rGen):
+    return lambda: rGen.expovariate(rate)
+
+# a period of period +- jitter, which has to stay positive so that no wake-up
+# is scheduled at or before the current time
+def jitteredWakeups(period, jitter, rGen):
+    if not 0 <= jitter < period:
+        raise ValueError('jitter must be in [0, period), got jitter ' + str(jitter) + ' for period ' + str(period))
+    return lambda: period + rGen.uniform(-jitter, jitter)
+
+# Event-driven version of the power control loops. Every access point wakes on
+# its own timer (Poisson with unit rate by default) and updates its power from
+# the S and r of its own network only, the wake-ups being kept in a priority
+# queue, so an update costs O(N) whatever the number of networks. Every
+# recordPeriod of simulated time the state of all networks is recorded, which
+# with unit rate wake-ups compares with one iteration of the lockstep loops.
+# wakeup(rGen) makes the wake-up timer from the scheduler's Random(seed), so
+# that seed alone reproduces a run whatever the timer.
+def runAsynchronous(networks, horizon, newPower, wakeup = None, recordPeriod = 1.0, seed = None, recordings = None,
+                    powerCutoff = None, maxPower = 1.0):
+    if recordings is None:
+        recordings = []
+        for network in networks:
+            recordings.append(Recording(network.index))
+    rGen = Random(seed)
+    wakeup = (wakeup or (lambda rGen: poissonWakeups(1.0, rGen)))(rGen)
+    deployment, state = deploymentState(networks, powerCutoff, maxPower)
+
+    events = [(wakeup(), j) for j in range(len(networks))]
+    heapq.heapify(events)
+    nextRecord = 0.0
+    while nextRecord < horizon:
+        if events[0][0] >= nextRecord:
+            throughputs = state.throughputs(EXPECTED_PACKET_SIZE)
+            dataRates = state.dataRates()
+            for j in range(len(networks)):
+                ap = networks[j].accessPoint
+                recordings[j].addDataPoint(ap.p, ap.gr, throughputs[j], dataRates[j], ap.memory.prevU)
+            nextRecord += recordPeriod
+            continue
+        time, j = heapq.heappop(events)
+        row = deployment.accessPointRows[j]
+        p = newPower(state, j, row)
+        state.setPower(row, p, newApSnrFloor(p))
+        heapq.heappush(events, (time + wakeup(), j))
+    return recordings
+
+def runAsynchronousPowerVariationAlgorithm(networks, horizon, c = 20, wakeup = None, recordPeriod = 1.0, seed = None, recordings = None,
+                                           powerCutoff = None):
+    return runAsynchronous(networks, horizon,
+                           lambda state, j, row: newApPowers(state.deployment, row, state.throughput(j, EXPECTED_PACKET_SIZE), state.dataRate(j), c),
+                           wakeup, recordPeriod, seed, recordings, powerCutoff)
+
+def runAsynchronousPowerVariationAlgorithmControl(networks, horizon, maxPower, powerCost, wakeup = None, recordPeriod = 1.0, seed = None, recordings = None,
+                                                  powerCutoff = None):
+    return runAsynchronous(networks, horizon,
+                           lambda state, j, row: newApPowersControl(state.deployment, row, state.throughput(j, EXPECTED_PACKET_SIZE), state.dataRate(j), maxPower, powerCost),
+                           wakeup, recordPeriod, seed, recordings, powerCutoff, maxPower)
+
+# The deployment of the networks and its InterferenceState: dense, or with a
+# powerCutoff culled to the links received above it from APs of up to maxPower,
+# printing the pairs kept and the interference neglected
+def deploymentState(networks, powerCutoff = None, maxPower = 1.0):
+    if powerCutoff is None:
+        deployment = Deployment(networks)
+        return deployment, InterferenceState(deployment)
+    deployment = CulledDeployment(networks, powerCutoff, maxPower)
+    print(deployment.summary())
+    return deployment, CulledInterferenceState(deployment)
+
+def hasConverged(convergence, deployment):
+    rows = deployment.accessPointRows
+    return convergence.update(deployment.p[...,rows], deployment.prevU[...,rows])
+
+def finishRecordings(recordings, numIterations, convergence):
+    if convergence is None:
+        return
+    for recording in recordings:
+        recording.pad(numIterations)
+        if convergence.converged:
+            recording.iterationsToConverge = int(convergence.iterationsToConverge)
+    convergence.finish()
+
+# normalised throughput and average data rate of a network, gains being either
+# a path gain matrix or an InterferenceState kept up to date by the caller
+def measureNetwork(network, interferingStations, gains=None):
+    if isinstance(gains, InterferenceState):
+        return gains.normalisedNetworkThroughput(network, EXPECTED_PACKET_SIZE), gains.getAverageDataRate20MHZ(network)
+    S = normalisedNetworkThroughput(network, interferingStations, EXPECTED_PACKET_SIZE, gains)
+    r = getAverageDataRate20MHZ(network, interferingStations, gains)
+    return S, r
+
 def oldnewApPower(network, interferingStations):
     return network.accessPoint.p + POWER_INCREMENT
 
-def newApPowerControl(network, interferingStations, maxPower, powerExponent):
+def newApPowerControl(network, interferingStations, maxPower, powerExponent, gains=None):
     #parameters
     powerGain=0.15 #temporary gain factor to avoid modifying global variables for now
     powerExponent = 0.3 #the larger this value the larger focus on minimizng power
@@ -137,9 +243,10 @@ def newApPowerControl(network, interferingStations, maxPower, powerExponent):
     maxCycles=20
     initialRef=65
     powerDecay=0.7
-    S = normalisedNetworkThroughput(network, interferingStations, EXPECTED_PACKET_SIZE)
-    r = getAverageDataRate20MHZ(network, interferingStations)
+    S, r = measureNetwork(network, interferingStations, gains)
     U=S*r/power(network.accessPoint.p,powerExponent)
+    # kept as the utility seen by the ConvergenceDetector and the recordings
+    network.accessPoint.memory.prevU = U
     
     ref = network.accessPoint.memory.uRef
     #first iteration of the algorithm
@@ -178,13 +285,12 @@ def newApPowerControl(network, interferingStations, maxPower, powerExponent):
              
     return newApPower
     
-def newApPower(network, interferingStations, c):
+def newApPower(network, interferingStations, c, gains=None):
     maxP = 1.0
     minP = 0.1
     p = network.accessPoint.p
     prevU = network.accessPoint.memory.prevU
-    S = normalisedNetworkThroughput(network, interferingStations, EXPECTED_PACKET_SIZE)
-    r = getAverageDataRate20MHZ(network, interferingStations)
+    S, r = measureNetwork(network, interferingStations, gains)
     
     y = S * r        
     u = y - c * p
@@ -196,11 +302,80 @@ def newApPower(network, interferingStations, c):
     return max(min(newP, maxP), minP)
     
 
+# newApPower for the access points in rows of a Deployment, given their
+# measured S and r. rows is either one row or an array of rows, and the arrays
+# may carry a leading trial axis.
+def newApPowers(deployment, rows, S, r, c):
+    maxP = 1.0
+    minP = 0.1
+    p = deployment.p[...,rows]
+    prevU = deployment.prevU[...,rows]
+
+    y = S * r
+    u = y - c * p
+    du = (u - prevU)
+
+    newP = p * (1 + du / u)
+    deployment.prevU[...,rows] = u
+
+    return clip(newP, minP, maxP)
+
+# newApPowerControl for the access points in rows of a Deployment, given their
+# measured S and r, the branches of the scalar controller being taken per
+# access point with where()
+def newApPowersControl(deployment, rows, S, r, maxPower, powerExponent):
+    #parameters
+    powerGain=0.15
+    powerExponent = 0.3
+    referenceDecay = 0.8
+    maxPowerBackoff=0.95*maxPower
+    referenceBackoffOnMaxPowerHit=0.9
+    minPower=0.05
+    maxCycles=20
+    initialRef=65
+    powerDecay=0.7
+    d = deployment
+    p = d.p[...,rows]
+    U=S*r/power(p,powerExponent)
+
+    ref = d.uRef[...,rows].copy()
+    #first iteration of the algorithm
+    first = d.prevUref[...,rows] == 0
+    prevUref = where(first, U, d.prevUref[...,rows])
+    uRef = where(first, initialRef, ref)
+    iterations = where(first, 1, d.iterations[...,rows])
+
+    below = U<ref
+    with errstate(divide='ignore', invalid='ignore'):
+        #reduce reference only if power has been increased for two consecutive cycles
+        uRef = where(below & (d.prevState[...,rows] == 1), power(referenceDecay, (ref-U)/ref) * ref, uRef)
+        iterations = where(below, iterations, iterations + 1)
+        newApPower = where(below, p + powerGain*(ref-U)/ref, p - powerGain*power(powerDecay, iterations))
+    prevState = where(below, 1, -1)
+
+    #resetting maximum capacity every n cycles
+    reset = iterations==maxCycles
+    iterations = where(reset, 3, iterations)
+    uRef = where(reset, ref*1.1, uRef)
+
+    hitMax = newApPower>maxPower
+    uRef = where(hitMax, ref*referenceBackoffOnMaxPowerHit, uRef)
+    newApPower = where(hitMax, maxPowerBackoff, where(newApPower<=0, minPower, newApPower))
+
+    d.prevU[...,rows] = U
+    d.prevUref[...,rows] = prevUref
+    d.uRef[...,rows] = uRef
+    d.iterations[...,rows] = iterations
+    d.prevState[...,rows] = prevState
+    return newApPower
+
 def newApSnrFloor(newApPower):
     return AP_INITIAL_SNR_FLOOR * newApPower / AP_INITIAL_POWER
     
 
-def createNetworks(a, b, width, length, xSpace, ySpace, n, isStandard):
+# isStandard always creates the same deployment, a seed gives each seed its own
+# reproducible deployment (seed 0 being the standard one)
+def createNetworks(a, b, width, length, xSpace, ySpace, n, isStandard, seed = None):
     networks = []
     for i in range(a):
         for j in range(b):
@@ -208,6 +383,8 @@ def createNetworks(a, b, width, length, xSpace, ySpace, n, isStandard):
             yOffset = j * (length + ySpace)
             if isStandard:
                 network = Network((i,j), xOffset, yOffset, width, length, n, seed = i*b + j)
+            elif seed != None:
+                network = Network((i,j), xOffset, yOffset, width, length, n, seed = (seed*a + i)*b + j)
             else:
                 network = Network((i,j), xOffset, yOffset, width, length, n)
             networks.append(network)
@@ -231,6 +408,7 @@ def congestionPlot():
         network2.addRandomMobileStations(2)
         probList.append(probabilityOfExactlyOneTransmission(network1, allStations(network2)))
         xaxis.append(i*2)
+    plt = pyplot()
     plt.plot(xaxis, probList)
     plt.show()
         
@@ -0,0 +1,39 @@
+from numpy import *
+from networkModel import *
+from interferenceState import *
+
+# Accuracy of the reduced precision engine (gains, distances and received
+# powers stored as float32, aggregates accumulated in float64) measured
+# against the float64 engine on the same deployment.
+
+# largest errors accepted: relative errors of the normalised throughputs and
+# the SINRs, and the fraction of mobile stations given another MCS
+PRECISION_TOLERANCE = dict(throughput=1e-5, sinr=1e-5, mcs=0.01)
+
+def relativeError(value, reference):
+    return (abs(value - reference) / maximum(abs(reference), finfo(float).tiny)).max()
+
+# Errors of the normalised throughput and average data rate of every network,
+# of the SINR of every mobile station from its AP, the fraction of mobile
+# stations whose MCS differs and the fraction of co-channel decisions that
+# flipped.
+def precisionErrors(networks, dtype = float32):
+    reference, reduced = map(lambda t: InterferenceState(Deployment(networks, dtype = t)), [float, dtype])
+    sinrs = map(lambda state: state.mobileStationSinrs(), [reference, reduced])
+    mcsTable = reference.mcsTable
+    return dict(throughput=relativeError(reduced.throughputs(EXPECTED_PACKET_SIZE), reference.throughputs(EXPECTED_PACKET_SIZE)),
+                dataRate=relativeError(reduced.dataRates(), reference.dataRates()),
+                sinr=relativeError(sinrs[1], sinrs[0]),
+                mcs=mean(mcsTable.entry(sinrs[1]) != mcsTable.entry(sinrs[0])),
+                cochannel=mean(reduced.cochannel != reference.cochannel))
+
+# precisionErrors of one deployment, printed along with the errors above
+# tolerance (PRECISION_TOLERANCE by default), which are also returned as a
+# dict of the measured errors
+def checkPrecision(networks, dtype = float32, tolerance = None):
+    tolerance = tolerance or PRECISION_TOLERANCE
+    errors = precisionErrors(networks, dtype)
+    exceeded = dict((name, errors[name]) for name in tolerance if errors[name] > tolerance[name])
+    print('%s precision check: ' % finfo(dtype).dtype + ', '.join('%s %.3g' % (name, errors[name]) for name in sorted(errors)) +
+          (' (above tolerance: ' + ', '.join(sorted(exceeded)) + ')' if exceeded else ''))
+    return exceeded
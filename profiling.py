@@ -0,0 +1,94 @@
+import importlib
+import json
+import os
+import sys
+import time
+
+# Opt-in instrumentation of the simulation phases. While a Profile is enabled
+# the listed functions are replaced, in every loaded module that imported them
+# (the modules use "from ... import *", so each holds its own reference), by
+# wrappers counting calls and summing wall time. Nothing is patched otherwise,
+# so a disabled profile costs nothing. Times are inclusive: a phase called
+# from another is also counted in the caller.
+
+# module defining the function, and the name of the function or Class.method
+PHASES = [('networkModel', 'sinr'),
+          ('networkModel', 'probabilityOfExactlyOneTransmission'),
+          ('networkModel', 'getAverageDataRate20MHZ'),
+          ('interferenceState', 'InterferenceState.refresh'),
+          ('interferenceState', 'InterferenceState.setPower'),
+          ('interferenceState', 'InterferenceState.throughputs'),
+          ('interferenceState', 'InterferenceState.dataRates'),
+          ('spatialIndex', 'CulledInterferenceState.refresh'),
+          ('spatialIndex', 'CulledInterferenceState.setPower'),
+          ('powervariation_sim', 'newApPower'),
+          ('powervariation_sim', 'newApPowerControl'),
+          ('powervariation_sim', 'newApPowers'),
+          ('powervariation_sim', 'newApPowersControl'),
+          ('powervariation_sim', 'createNetworks'),
+          ('plotting', 'plotTimeseries')]
+
+class Profile:
+    def __init__(self, phases = PHASES):
+        self.phases = phases
+        self.calls = dict((name, 0) for module, name in phases)
+        self.times = dict((name, 0.0) for module, name in phases)
+        self.patched = []
+
+    def timed(self, name, f):
+        def wrapper(*args, **kwargs):
+            start = time.time()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                self.times[name] += time.time() - start
+                self.calls[name] += 1
+        wrapper.__name__ = f.__name__
+        return wrapper
+
+    def patch(self, owner, attribute, value):
+        self.patched.append((owner, attribute, owner.__dict__[attribute]))
+        setattr(owner, attribute, value)
+
+    def enable(self):
+        for moduleName, name in self.phases:
+            module = importlib.import_module(moduleName)
+            if '.' in name:
+                className, methodName = name.split('.')
+                cls = getattr(module, className)
+                self.patch(cls, methodName, self.timed(name, cls.__dict__[methodName]))
+                continue
+            original = getattr(module, name)
+            wrapper = self.timed(name, original)
+            for loaded in list(sys.modules.values()):
+                if loaded is not None and loaded.__dict__.get(name) is original:
+                    self.patch(loaded, name, wrapper)
+        return self
+
+    def disable(self):
+        for owner, attribute, original in reversed(self.patched):
+            setattr(owner, attribute, original)
+        self.patched = []
+
+    def __enter__(self):
+        return self.enable()
+
+    def __exit__(self, *exception):
+        self.disable()
+
+    def summary(self):
+        lines = ['%-36s %10s %12s %12s' % ('phase', 'calls', 'total s', 'per call ms')]
+        for module, name in sorted(self.phases, key=lambda phase: -self.times[phase[1]]):
+            if self.calls[name]:
+                lines.append('%-36s %10d %12.4f %12.4f' % (name, self.calls[name], self.times[name],
+                                                           1000 * self.times[name] / self.calls[name]))
+        return '\n'.join(lines)
+
+    # the summary table, and the raw counts as JSON next to it
+    def dump(self, fileName):
+        if os.path.dirname(fileName) and not os.path.isdir(os.path.dirname(fileName)):
+            os.makedirs(os.path.dirname(fileName))
+        with open(fileName, 'w') as f:
+            f.write(self.summary() + '\n')
+        with open(fileName + '.json', 'w') as f:
+            json.dump(dict(calls=self.calls, times=self.times), f, indent=2, sort_keys=True)
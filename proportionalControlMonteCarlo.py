@@ -6,71 +6,135 @@ Created on Wed Apr 27 19:32:17 2016
 """
 import csv
 from powervariation_sim import *
+from batchSimulation import *
+from parallelRunner import *
+from streamingRecorder import *
+from resultStore import *
+from resultCache import *
+from profiling import Profile
+from plotting import Renderer, render
+from staticPower import staticPowerThroughputs, optimalStaticPower
 from numpy import *
 import os
 
 def testProportionalControlAlgorithm(a, b, iRange, jRange,
                      width, length, xSpace, ySpace, 
-                     n, isStandard, numIterations, mcIterations, maxPower, powerCost):
-    numNetworksToPlot = (iRange[1] + 1 - iRange[0]) * (jRange[1] + 1 - jRange[0])
-    
-    sumNormalisedThroughputTss = zeros([numNetworksToPlot, numIterations])
-    sumDataRateTss = zeros([numNetworksToPlot, numIterations])
-    sumApPowerTss = zeros([numNetworksToPlot, numIterations])
-    sumThroughputTss = zeros([numNetworksToPlot, numIterations])
-    sumUtilityTss = zeros([numNetworksToPlot, numIterations])
+                     n, isStandard, numIterations, mcIterations, maxPower, powerCost, batchSize = None, convergence = None,
+                     spillPrefix = None, store = None, profile = False, renderer = None,
+                     staticLevels = None, staticSweeps = 1, dtype = float, seed = None):
+    profiler = Profile().enable() if profile else None
+    # trial t is the deployment of trialSeed(seed, t), as with runPoints
+    if seed is None:
+        seed = newSeed()
     maxPs = []
     avgPs = []
+    optimalPs = []
+    writer = None
+    if store is not None:
+        writer = store.writer('ProportionalControl' + proportionalControlParams(a, b, width, length, xSpace, ySpace, n, numIterations, powerCost, maxPower, mcIterations)[:-4],
+                              dict(algorithm='ProportionalControl', a=a, b=b, width=width, length=length, xSpace=xSpace, ySpace=ySpace,
+                                   n=n, isStandard=isStandard, numIterations=numIterations, mcIterations=mcIterations,
+                                   maxPower=maxPower, powerCost=powerCost,
+                                   seed=seed, trialSeeds=map(lambda t: trialSeed(seed, t, mcIterations), range(mcIterations))), mcIterations)
+    recorder = StreamingRecorder(numIterations, spillPrefix, store = writer)
+    trials = monteCarloTrials(lambda t: createNetworks(a, b, width, length, xSpace, ySpace, n, isStandard, trialSeed(seed, t, mcIterations)),
+                              lambda networks, recordings: runPowerVariationAlgorithmControl(networks, numIterations, maxPower, powerCost, convergence, recordings),
+                              lambda batch: runBatchedPowerVariationAlgorithmControl(batch, numIterations, maxPower, powerCost, convergence, dtype = dtype),
+                              mcIterations, batchSize, recorder)
     for i in range(mcIterations):
         print("Running iteration " + str(i+1) + "/" + str(mcIterations))
-        networks = createNetworks(a, b, width, length, xSpace, ySpace, n, isStandard)        
-        recordings = runPowerVariationAlgorithmControl(networks, numIterations, maxPower, powerCost)
+        networks, recordings = next(trials)
         recordingsToPlot = filter(lambda r: inRange(r.index[0], iRange) and inRange(r.index[1], jRange), recordings)
         
         labels = map(lambda r: 'Network' + str(r.index), recordingsToPlot)
         
-        sumNormalisedThroughputTss += array(map(lambda r: r.normalisedThroughput, recordingsToPlot))
-        sumDataRateTss += array(map(lambda r: r.dataRate, recordingsToPlot))
-        sumApPowerTss += array(map(lambda r: r.apPower, recordingsToPlot))
-        sumThroughputTss += array(map(lambda r: multiply(r.dataRate, r.normalisedThroughput), recordingsToPlot))
-        maxPower = max (map(lambda r: r.apPower, recordingsToPlot))
-        avgPower = mean(map(lambda r: r.apPower, recordingsToPlot))
-        maxPowerThroughput=testThroughputUsingPresetPower(networks, maxPower, [1,3], [1,2])
-        avgPowerThroughput=testThroughputUsingPresetPower(networks, maxPower, [1,3], [1,2])
+        # static references on the same geometry: every AP at the maximum or
+        # the average final power and, given staticLevels (for example
+        # linspace(POWER_INCREMENT, maxPower, 20)), the optimal static AP powers
+        maxApPower = max(map(lambda r: r.apPower[-1], recordingsToPlot))
+        avgApPower = mean(map(lambda r: r.apPower[-1], recordingsToPlot))
+        maxPowerThroughput, avgPowerThroughput = staticPowerThroughputs(networks, [maxApPower, avgApPower], [1,3], [1,2])
         maxPs.append(maxPowerThroughput)
         avgPs.append(avgPowerThroughput)
-    avgNormalisedThroughputTss = sumNormalisedThroughputTss / mcIterations
-    avgDataRateTss = sumDataRateTss / mcIterations
-    avgApPowerTss = sumApPowerTss / mcIterations
-    avgThroughputTss = sumThroughputTss / mcIterations
+        if staticLevels is not None:
+            optimalPowers, optimalPowerThroughput = optimalStaticPower(networks, staticLevels, [1,3], [1,2], staticSweeps)
+            optimalPs.append(optimalPowerThroughput)
+    recorder.close()
+    avgNormalisedThroughputTss, avgDataRateTss, avgApPowerTss, avgThroughputTss, avgUtilityTss = recorder.mean[:,recorder.networksInRange(iRange, jRange)]
     avgPs = mean(avgPs)
     maxPs = mean(maxPs)
-    with open('staticpowerthroughput.csv', 'w') as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerows('cost', powerCost, 'max power', maxPower, 'avgPthroughput', avgPs, 'maxPthroughput', maxPs)
+    optimalPs = mean(optimalPs) if optimalPs else ''
+    # one row per parameter point, the header written with the first one
+    newFile = not os.path.isfile('staticpowerthroughput.csv')
+    with open('staticpowerthroughput.csv', 'a') as csvfile:
+        csvWriter = csv.writer(csvfile)
+        if newFile:
+            csvWriter.writerow(['cost', 'max power', 'avgPthroughput', 'maxPthroughput', 'optimalPthroughput'])
+        csvWriter.writerow([powerCost, maxPower, avgPs, maxPs, optimalPs])
+    
+    params = proportionalControlParams(a, b, width, length, xSpace, ySpace, n, numIterations, powerCost, maxPower, mcIterations)
+    render(renderer, plotProportionalControl, params, [avgNormalisedThroughputTss, avgDataRateTss, avgApPowerTss, avgThroughputTss], labels)
     
-    params = ' cellDim=' + str((a,b)) + ' networkDim=' + str((width, length)) \
+    if profiler is not None:
+        profiler.disable()
+        print(profiler.summary())
+        profiler.dump('figures/ODE Algorithm/Profile' + params[:-len('.png')] + '.txt')
+        if writer is not None:
+            profiler.dump(os.path.join(writer.path, 'profile.txt'))
+
+def proportionalControlParams(a, b, width, length, xSpace, ySpace, n, numIterations, powerCost, maxPower, mcIterations):
+    return ' cellDim=' + str((a,b)) + ' networkDim=' + str((width, length)) \
                 + ' spacing=' + str((xSpace, ySpace)) + ' nodes=' + str(n) \
                 + ' iter=' + str(numIterations) + ' powerCost=' + str(powerCost) + ' maxPower=' + str(maxPower) + ' mcIter=' + str(mcIterations) + '.png'
-    
+
+def plotProportionalControl(params, averages, labels):
     figDir = 'figures/ODE Algorithm'
     if not os.path.isdir(figDir):
         os.makedirs(figDir)
     
-    plotTimeseries(avgNormalisedThroughputTss, labels, 'Normalised Throughput', figDir + '/Normalised Throughput' + params)
-    plotTimeseries(avgDataRateTss, labels, 'Data Rate', figDir + '/Data Rate' + params)
-    plotTimeseries(avgApPowerTss, labels, 'AP Power', figDir + '/AP Power' + params)
-    plotTimeseries(avgThroughputTss, labels, 'Throughput', figDir + '/Throughput' + params)
+    plotTimeseries(averages[0], labels, 'Normalised Throughput', figDir + '/Normalised Throughput' + params)
+    plotTimeseries(averages[1], labels, 'Data Rate', figDir + '/Data Rate' + params)
+    plotTimeseries(averages[2], labels, 'AP Power', figDir + '/AP Power' + params)
+    plotTimeseries(averages[3], labels, 'Throughput', figDir + '/Throughput' + params)
 
+# the figures are drawn in the background by a Renderer while the next point runs
 def testProportionalControlParameters (maxPowerInitial, maxPowerFinal, maxPowerStep, powerCostInitial, powerCostFinal, powerCostStep, numIterations, mcIterations):
+    renderer = Renderer()
     maxPower=maxPowerInitial
     for i in range(int((maxPowerFinal-maxPowerInitial)/maxPowerStep)):
         powerCost = powerCostInitial
         for j in range (int((powerCostFinal-powerCostInitial)/powerCostStep)):
                 testProportionalControlAlgorithm(a = 5, b = 4, iRange = [1,3], jRange = [1,2],
                                                      width = 7, length = 7, xSpace = 7, ySpace = 7,
-                                                     n = 6, isStandard = False, numIterations=numIterations, mcIterations=mcIterations, maxPower=maxPower, powerCost=powerCost)
+                                                     n = 6, isStandard = False, numIterations=numIterations, mcIterations=mcIterations, maxPower=maxPower, powerCost=powerCost, renderer=renderer)
                 powerCost = powerCost + powerCostStep
         maxPower = maxPower + maxPowerStep
- 
-testProportionalControlParameters(0.5, 0.8, 0.1, 0, 0.2, 0.1, 5, 2)       
\ No newline at end of file
+    renderer.close()
+
+# the time series of testProportionalControlParameters with the trials of the
+# whole maxPower x powerCost grid spread over a process pool (the static power
+# baselines are only evaluated by the serial version) and the figures drawn by
+# a Renderer. With a ResultStore the series of every trial are kept in it.
+def testProportionalControlParametersParallel(maxPowerInitial, maxPowerFinal, maxPowerStep, powerCostInitial, powerCostFinal, powerCostStep,
+                                              numIterations, mcIterations, seed = 0, numWorkers = None, cache = None, store = None):
+    points = []
+    maxPower=maxPowerInitial
+    for i in range(int((maxPowerFinal-maxPowerInitial)/maxPowerStep)):
+        powerCost = powerCostInitial
+        for j in range (int((powerCostFinal-powerCostInitial)/powerCostStep)):
+            points.append(dict(a=5, b=4, iRange=[1,3], jRange=[1,2], width=7, length=7, xSpace=7, ySpace=7, n=6,
+                               numIterations=numIterations, maxPower=maxPower, powerCost=powerCost))
+            powerCost = powerCost + powerCostStep
+        maxPower = maxPower + maxPowerStep
+    renderer = Renderer(numWorkers or cpu_count())
+    for point, averages in zip(points, runPoints(points, mcIterations, seed, numWorkers, cache, store)):
+        labels = map(lambda index: 'Network' + str(index), networksToPlot(point))
+        params = proportionalControlParams(5, 4, 7, 7, 7, 7, 6, numIterations, point['powerCost'], point['maxPower'], mcIterations)
+        renderer.submit(plotProportionalControl, params, averages[:4], labels)
+    renderer.close()
+
+
+# the same sweep is described by scenarios/proportionalControl.json for
+# scenarioRunner.py
+if __name__ == '__main__':
+    testProportionalControlParameters(0.5, 0.8, 0.1, 0, 0.2, 0.1, 5, 2)
@@ -0,0 +1,78 @@
+from numpy import *
+import networkModel
+import hashlib
+import json
+import os
+
+# Disk cache of simulation results keyed by a hash of everything that
+# determines them: the parameters, the seed and the model constants of
+# networkModel. Changing a constant changes every key, so stale results are
+# never returned and simply age out. Entries are .npy files whose modification
+# time is refreshed on every hit, the least recently used being evicted once
+# the cache grows beyond maxBytes.
+
+# the constants of networkModel that the results depend on, listed by name
+# because networkModel also carries numpy's upper case names (NAN, ERR_*...)
+# through its star import, which must not change the keys
+MODEL_CONSTANTS = ['AP_INITIAL_POWER', 'MS_INITIAL_POWER', 'POWER_INCREMENT',
+                   'AP_INITIAL_SNR_FLOOR', 'MS_INITIAL_SNR_FLOOR', 'WHITE_NOISE', 'UNITY_GAIN', 'AP_GAIN',
+                   'MS_PROBABILITY_OF_NONEMPTY_BUFFER', 'AP_PROBABILITY_OF_NONEMPTY_BUFFER', 'CW_MIN',
+                   'C', 'SIFS', 'DIFS', 'SLOT_TIME', 'TRANSMISSION_SPEED', 'RTS', 'CTS', 'ACK',
+                   'EXPECTED_PACKET_SIZE']
+
+# the model constants and the MCS table
+def modelConstants():
+    constants = dict((name, getattr(networkModel, name)) for name in MODEL_CONSTANTS)
+    table = networkModel.MCS_TABLE_20MHZ
+    constants['MCS_TABLE_20MHZ'] = [table.thresholds.tolist(), table.mcs.tolist(), table.rates.tolist()]
+    return constants
+
+def cacheKey(params, seed):
+    description = json.dumps(dict(params=params, seed=seed, constants=modelConstants()), sort_keys=True)
+    return hashlib.sha1(description.encode('utf-8')).hexdigest()
+
+class ResultCache:
+    def __init__(self, root, maxBytes = 1 << 30):
+        self.root = root
+        self.maxBytes = maxBytes
+        if not os.path.isdir(root):
+            os.makedirs(root)
+
+    def fileName(self, key):
+        return os.path.join(self.root, key + '.npy')
+
+    # stored result, or None on a miss
+    def get(self, params, seed):
+        fileName = self.fileName(cacheKey(params, seed))
+        if not os.path.isfile(fileName):
+            return None
+        os.utime(fileName, None)
+        return load(fileName)
+
+    # written under a temporary name and renamed, so readers never see a
+    # partial entry
+    def put(self, params, seed, result):
+        fileName = self.fileName(cacheKey(params, seed))
+        temporary = fileName + '.%d.tmp' % os.getpid()
+        with open(temporary, 'wb') as f:
+            save(f, result)
+        os.rename(temporary, fileName)
+        self.evict()
+
+    def entries(self):
+        fileNames = [os.path.join(self.root, name) for name in os.listdir(self.root) if name.endswith('.npy')]
+        return [(os.path.getmtime(name), os.path.getsize(name), name) for name in fileNames]
+
+    # removes the least recently used entries until the cache fits in maxBytes
+    def evict(self):
+        entries = sorted(self.entries())
+        size = sum([entry[1] for entry in entries])
+        for modified, entrySize, fileName in entries:
+            if size <= self.maxBytes:
+                break
+            os.remove(fileName)
+            size -= entrySize
+
+    def clear(self):
+        for modified, entrySize, fileName in self.entries():
+            os.remove(fileName)
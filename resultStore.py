@@ -0,0 +1,109 @@
+from numpy import *
+from numpy.lib.format import open_memmap
+from streamingRecorder import SERIES
+import json
+import os
+
+# A run is stored as a directory holding metadata.json and one .npy file per
+# series, indexed [trial, network, iteration]. The series files are written
+# through memory maps as the trials complete and are read back memory-mapped,
+# so sweeps larger than memory can be sliced and re-plotted.
+
+def writeMetadata(path, metadata):
+    with open(os.path.join(path, 'metadata.json'), 'w') as metadataFile:
+        json.dump(metadata, metadataFile, indent=2, sort_keys=True)
+
+def readMetadata(path):
+    with open(os.path.join(path, 'metadata.json')) as metadataFile:
+        return json.load(metadataFile)
+
+# Writes the trials of one run. The network indexes are only known once the
+# first trial has been created, the StreamingRecorder the writer is given to
+# then calls allocate() before adding the trials.
+class ResultWriter:
+    def __init__(self, path, metadata, numTrials):
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        self.path = path
+        self.metadata = dict(metadata)
+        self.numTrials = numTrials
+        self.count = 0
+        self.arrays = None
+
+    def allocate(self, index, numIterations):
+        self.metadata['index'] = map(list, index)
+        self.metadata['series'] = SERIES
+        shape = (self.numTrials, len(index), numIterations)
+        self.arrays = map(lambda name: open_memmap(os.path.join(self.path, name + '.npy'), mode='w+', dtype=float64, shape=shape), SERIES)
+        self.metadata['trials'] = 0
+        self.metadata['complete'] = False
+        writeMetadata(self.path, self.metadata)
+
+    # series of one trial, indexed [series, network, iteration]
+    def addTrial(self, series):
+        for k in range(len(SERIES)):
+            self.arrays[k][self.count] = series[k]
+        self.count += 1
+
+    def close(self):
+        if self.arrays is None:
+            return
+        for array in self.arrays:
+            array.flush()
+        self.metadata['trials'] = self.count
+        self.metadata['complete'] = self.count == self.numTrials
+        writeMetadata(self.path, self.metadata)
+        self.arrays = None
+
+# A stored run, its series memory-mapped read-only and trimmed to the trials
+# actually written
+class StoredRun:
+    def __init__(self, path):
+        self.path = path
+        self.metadata = readMetadata(path)
+        self.index = map(tuple, self.metadata['index'])
+        self.numTrials = self.metadata['trials']
+        for name in SERIES:
+            setattr(self, name, load(os.path.join(path, name + '.npy'), mmap_mode='r')[:self.numTrials])
+
+    def networksInRange(self, iRange, jRange):
+        return array(map(lambda index: iRange[0] <= index[0] <= iRange[1] and jRange[0] <= index[1] <= jRange[1], self.index))
+
+    # mean over trials of a series for the selected networks, read chunkSize
+    # trials at a time
+    def mean(self, name, networks = slice(None), chunkSize = 100):
+        series = getattr(self, name)
+        total = zeros(series[:1, networks].shape[1:])
+        for start in range(0, self.numTrials, chunkSize):
+            total += series[start:start+chunkSize, networks].sum(axis=0)
+        return total / max(self.numTrials, 1)
+
+# A directory of runs, each in its own subdirectory
+class ResultStore:
+    def __init__(self, root):
+        self.root = root
+        if not os.path.isdir(root):
+            os.makedirs(root)
+
+    def writer(self, name, metadata, numTrials):
+        return ResultWriter(os.path.join(self.root, name), metadata, numTrials)
+
+    def run(self, name):
+        return StoredRun(os.path.join(self.root, name))
+
+    # whether all the trials of the run have been written
+    def hasRun(self, name):
+        path = os.path.join(self.root, name)
+        return os.path.isfile(os.path.join(path, 'metadata.json')) and readMetadata(path).get('complete', False)
+
+    # names of the runs whose metadata has the given values
+    def runs(self, **metadata):
+        names = []
+        for name in sorted(os.listdir(self.root)):
+            path = os.path.join(self.root, name)
+            if not os.path.isfile(os.path.join(path, 'metadata.json')):
+                continue
+            stored = readMetadata(path)
+            if all(map(lambda key: stored.get(key) == metadata[key], metadata)):
+                names.append(name)
+        return names
@@ -0,0 +1,143 @@
+from numpy import *
+from parallelRunner import *
+from resultCache import ResultCache, cacheKey
+from plotting import Renderer
+import powerAllocationGame as game
+import argparse
+import itertools
+import json
+import numpy
+import os
+
+# Headless sweeps described by a scenario file, a JSON object such as
+#
+#   {"name": "ode-c", "controller": "ode",
+#    "grid": [5, 4], "cell": [7, 7], "spacing": [7, 7], "nodes": 6,
+#    "plotRange": {"i": [1, 3], "j": [1, 2]},
+#    "parameters": {"c": [20, 25, 30]},
+#    "iterations": 20, "trials": 100, "seed": 0}
+#
+# controller is "ode" (parameter c) or "proportionalControl" (maxPower and
+# powerCost) for the power variation algorithms, or "ismGame" (pMax, c and
+# users) for the ISM-band game, whose trials are its simulated systems.
+# Parameter values are lists or {"start", "stop", "step"} ranges including
+# stop. Optional "options" (synchronous, powerTolerance, utilityTolerance)
+# are added to every point.
+#
+# The scenario is expanded into one point per combination of parameter values
+# and the points are run a chunk at a time. Every finished point is kept in a
+# ResultCache under the output directory, so an interrupted sweep started
+# again only runs the points that are missing. manifest.json lists the points
+# and which of them are done.
+
+def loadScenario(fileName):
+    with open(fileName) as f:
+        return json.load(f)
+
+def parameterValues(spec):
+    if isinstance(spec, dict):
+        count = int(round((spec['stop'] - spec['start']) / spec['step'])) + 1
+        return [spec['start'] + k * spec['step'] for k in range(count)]
+    if isinstance(spec, list):
+        return spec
+    return [spec]
+
+# the points of a scenario, in the form taken by parallelRunner.runPoints (or,
+# for the ISM-band game, by runGamePoint)
+def expandScenario(scenario):
+    names = sorted(scenario['parameters'])
+    values = map(lambda name: parameterValues(scenario['parameters'][name]), names)
+    points = []
+    for combination in itertools.product(*values):
+        point = dict(zip(names, combination))
+        if scenario['controller'] != 'ismGame':
+            a, b = scenario['grid']
+            point.update(a=a, b=b, width=scenario['cell'][0], length=scenario['cell'][1],
+                         xSpace=scenario['spacing'][0], ySpace=scenario['spacing'][1], n=scenario['nodes'],
+                         iRange=scenario['plotRange']['i'], jRange=scenario['plotRange']['j'],
+                         numIterations=scenario['iterations'])
+        point.update(scenario.get('options', {}))
+        points.append(point)
+    return points
+
+# average system capacity of an ISM-band game point, all points of a scenario
+# being played on the same systems drawn from seed
+def runGamePoint(point, numSimulation, seed):
+    numpy.random.seed(seed)
+    return array(game.averageSystemCapacity(point['pMax'], point['c'], point['users'], numSimulation,
+                                            equilibrium = point.get('equilibrium', False)))
+
+def pointParams(point, trials):
+    return dict(point=point, mcIterations=trials)
+
+def writeManifest(outDir, scenario, points, done):
+    manifest = dict(scenario=scenario,
+                    points=[dict(point=point, key=cacheKey(pointParams(point, scenario['trials']), scenario.get('seed', 0)), done=isDone)
+                            for point, isDone in zip(points, done)])
+    temporary = os.path.join(outDir, 'manifest.json.tmp')
+    with open(temporary, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.rename(temporary, os.path.join(outDir, 'manifest.json'))
+
+# Runs the points of a scenario that are not in outDir yet, chunkSize points
+# at a time (by default as many as there are workers), and returns the results
+# of all points.
+def runScenario(scenario, outDir, numWorkers = None, chunkSize = None):
+    points = expandScenario(scenario)
+    trials = scenario['trials']
+    seed = scenario.get('seed', 0)
+    cache = ResultCache(os.path.join(outDir, 'points'), maxBytes = float('inf'))
+    done = map(lambda point: cache.get(pointParams(point, trials), seed) is not None, points)
+    print('%s: %d of %d points done' % (scenario.get('name', 'scenario'), sum(done), len(points)))
+    writeManifest(outDir, scenario, points, done)
+
+    pending = [k for k in range(len(points)) if not done[k]]
+    chunkSize = chunkSize or numWorkers or cpu_count()
+    for start in range(0, len(pending), chunkSize):
+        chunk = pending[start:start + chunkSize]
+        if scenario['controller'] == 'ismGame':
+            for k in chunk:
+                cache.put(pointParams(points[k], trials), seed, runGamePoint(points[k], trials, seed))
+        else:
+            runPoints(map(lambda k: points[k], chunk), trials, seed, numWorkers, cache)
+        for k in chunk:
+            done[k] = True
+        writeManifest(outDir, scenario, points, done)
+        print('%s: %d of %d points done' % (scenario.get('name', 'scenario'), sum(done), len(points)))
+    return points, map(lambda point: cache.get(pointParams(point, trials), seed), points)
+
+# the figures of the power variation points, as drawn by the sweep drivers
+def plotScenario(scenario, points, results, numWorkers = 1):
+    from monteCarlo import plotOdeAlgorithm, odeParams
+    from proportionalControlMonteCarlo import plotProportionalControl, proportionalControlParams
+    renderer = Renderer(numWorkers)
+    for point, averages in zip(points, results):
+        labels = map(lambda index: 'Network' + str(index), networksToPlot(point))
+        if scenario['controller'] == 'ode':
+            renderer.submit(plotOdeAlgorithm, odeParams(point['a'], point['b'], point['width'], point['length'], point['xSpace'], point['ySpace'],
+                                                        point['c'], point['n'], point['numIterations'], scenario['trials']), averages, labels)
+        elif scenario['controller'] == 'proportionalControl':
+            renderer.submit(plotProportionalControl, proportionalControlParams(point['a'], point['b'], point['width'], point['length'], point['xSpace'],
+                                                                               point['ySpace'], point['n'], point['numIterations'], point['powerCost'],
+                                                                               point['maxPower'], scenario['trials']), averages[:4], labels)
+    renderer.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the sweep of a scenario file, resuming from its output directory')
+    parser.add_argument('scenario', help='scenario JSON file')
+    parser.add_argument('--out', help='output directory, default results/<scenario name>')
+    parser.add_argument('--workers', type=int, help='worker processes, default one per CPU')
+    parser.add_argument('--chunk', type=int, help='points run between checkpoints, default one per worker')
+    parser.add_argument('--plot', action='store_true', help='draw the figures of the finished sweep')
+    args = parser.parse_args()
+
+    scenario = loadScenario(args.scenario)
+    outDir = args.out or os.path.join('results', scenario.get('name', os.path.splitext(os.path.basename(args.scenario))[0]))
+    if not os.path.isdir(outDir):
+        os.makedirs(outDir)
+    points, results = runScenario(scenario, outDir, args.workers, args.chunk)
+    if args.plot:
+        plotScenario(scenario, points, results, args.workers or 1)
+    if scenario['controller'] == 'ismGame':
+        for point, capacity in zip(points, results):
+            print('%s %f' % (point, capacity))
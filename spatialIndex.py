@@ -0,0 +1,251 @@
+from numpy import *
+from networkModel import *
+from interferenceState import *
+
+# distance beyond which a transmitter of power maxPower is received with less
+# than powerCutoff by a receiver of gain receiverGain
+def cutoffRadius(maxPower, receiverGain, powerCutoff):
+    L = 10*log10(maxPower * receiverGain / powerCutoff)
+    return 10**((L - 20*log10(2400) - 14 + 28) / 30)
+
+# the concatenated ranges [start, start + count) of every pair of starts and counts
+def raggedRanges(starts, counts):
+    ends = cumsum(counts)
+    return repeat(starts - ends + counts, counts) + arange(ends[-1] if len(ends) else 0)
+
+# Uniform grid of square cells over station positions
+class SpatialIndex:
+    def __init__(self, x, y, cellSize):
+        self.x = x
+        self.y = y
+        self.cellSize = float(cellSize)
+        self.cells = {}
+        for row, cell in enumerate(zip(self.cellOf(x), self.cellOf(y))):
+            self.cells.setdefault(cell, []).append(row)
+
+    def cellOf(self, coordinate):
+        return floor(asarray(coordinate) / self.cellSize).astype(int)
+
+    # rows of the stations within radius of (x, y), in ascending order
+    def within(self, x, y, radius):
+        reach = int(ceil(radius / self.cellSize))
+        i, j = self.cellOf(x), self.cellOf(y)
+        rows = []
+        for di in range(-reach, reach + 1):
+            for dj in range(-reach, reach + 1):
+                rows.extend(self.cells.get((i + di, j + dj), []))
+        rows = array(sorted(rows), dtype=int)
+        return rows[(self.x[rows] - x)**2 + (self.y[rows] - y)**2 <= radius**2]
+
+    # every ordered pair (i, k) of stations at most radius apart, itself
+    # included. The stations are sorted by cell and, for each of the
+    # neighbouring cell offsets, the stations of the offset cell are looked up
+    # for all stations at once.
+    def pairsWithin(self, radius):
+        reach = int(ceil(radius / self.cellSize))
+        i, j = self.cellOf(self.x), self.cellOf(self.y)
+        i, j = i - i.min() + reach, j - j.min() + reach
+        height = j.max() + reach + 1
+        cell = i * height + j
+        order = argsort(cell, kind='mergesort')
+        sortedCells = cell[order]
+        pairs = []
+        for di in range(-reach, reach + 1):
+            for dj in range(-reach, reach + 1):
+                target = cell + di * height + dj
+                starts = searchsorted(sortedCells, target)
+                counts = searchsorted(sortedCells, target, side='right') - starts
+                first = repeat(arange(len(cell)), counts)
+                second = order[raggedRanges(starts, counts)]
+                near = (self.x[first] - self.x[second])**2 + (self.y[first] - self.y[second])**2 <= radius**2
+                pairs.append((first[near], second[near]))
+        return concatenate(map(lambda pair: pair[0], pairs)), concatenate(map(lambda pair: pair[1], pairs))
+
+# Deployment whose link gains are only kept between stations closer than the
+# distance at which a transmitter of maxPower falls below powerCutoff at the
+# strongest receiver, plus between all stations of the same network. No N x N
+# matrix is built: the links are kept sorted by receiver and then transmitter
+# (linkReceiver, linkTransmitter, linkGain, linkKeys = receiver*N +
+# transmitter), and found with a SpatialIndex in O(N + links). The scalar
+# model reaches them through linkGains() and the array engine through
+# CulledInterferenceState.
+# Which cutoffs and grids benefit: a cutoff at or below the smallest
+# snrFloor * WHITE_NOISE / gr (1.6e-10 W with the default floors) keeps the
+# co-channel sets exact, but the many transmitters below it still add up. On
+# 20 x 20 cells of 6 mobile stations (280 m across) the neglected interference
+# is 96 times the white noise at 1.6e-10 W (65 m radius) and 8 times at
+# 1e-11 W (163 m), with data rates off by 4-5 Mbit/s, while at 1e-12 W (352 m)
+# it is 0.04 times the noise and the data rates are exact, so only cutoffs of
+# 1e-12 W or below are accurate. A link takes about 50 bytes against 26 for an
+# entry of the dense matrices, so culling only saves memory once fewer than
+# half of the pairs are kept. With 7 m cells 7 m apart and 1e-12 W the pairs
+# kept are 100% on 20 x 20 cells (2,800 stations, 280 m across), 66% on
+# 40 x 40 (11,200 stations, 560 m), 23% on 80 x 80 (44,800 stations, 1.1 km)
+# and 7% on 160 x 160 (179,200 stations, 2.2 km). At an accurate cutoff
+# culling therefore gains nothing on grids up to about 40 x 40 cells, which
+# the dense engine holds in a few GB, and only pays on deployments more than
+# about three times the cutoff radius (1 km) across, where the dense
+# matrices no longer fit in memory. The runners print summary(), the
+# fraction of pairs kept and the interference neglected at a sample of
+# receivers; check it before relying on a cutoff.
+class CulledDeployment(Deployment):
+    def __init__(self, networks, powerCutoff, maxPower=1.0, cellSize=None):
+        Deployment.__init__(self, networks, dense=False)
+        self.powerCutoff = powerCutoff
+        self.maxPower = maxPower
+        self.radius = cutoffRadius(maxPower, self.gr.max(), powerCutoff)
+        self.cellSize = cellSize or self.radius
+        self.update()
+
+    def update(self):
+        if self.gainPositions is not None and array_equal(self.x, self.gainPositions[0]) and array_equal(self.y, self.gainPositions[1]):
+            return False
+        self.gainPositions = (self.x.copy(), self.y.copy())
+        self.index = SpatialIndex(self.x, self.y, self.cellSize)
+        numStations = len(self.x)
+        near = self.index.pairsWithin(self.radius)
+        near = compress(self.network[near[0]] != self.network[near[1]], near, axis=1)
+        # the stations of a network are consecutive rows, its AP last
+        sizes = array(map(len, self.mobileStationRows)) + 1
+        starts = array(self.accessPointRows) - sizes + 1
+        receivers = arange(numStations)
+        sameNetwork = (repeat(receivers, sizes[self.network]), raggedRanges(starts[self.network], sizes[self.network]))
+        self.linkKeys = sort(concatenate([near[1] * numStations + near[0], sameNetwork[0] * numStations + sameNetwork[1]]))
+        self.linkReceiver = self.linkKeys // numStations
+        self.linkTransmitter = self.linkKeys % numStations
+        t, r = self.linkTransmitter, self.linkReceiver
+        self.linkGain = pathLossArray(sqrt((self.x[t] - self.x[r])**2 + (self.y[t] - self.y[r])**2))
+        self.linkBounds = searchsorted(self.linkReceiver, arange(numStations + 1))
+        self.candidates = split(self.linkTransmitter, self.linkBounds[1:-1])
+        self.candidateGains = split(self.linkGain, self.linkBounds[1:-1])
+        return True
+
+    # stations are kept as a boolean mask so that linkGains only has to look
+    # up the candidates of the receiver
+    def rowsOf(self, stations):
+        if isinstance(stations, ndarray) and stations.dtype == bool:
+            return stations
+        mask = zeros(len(self.x), dtype=bool)
+        mask[Deployment.rowsOf(self, stations)] = True
+        return mask
+
+    def linkGains(self, rows, receiverRow):
+        candidates = self.candidates[receiverRow]
+        isKept = rows[candidates]
+        return candidates[isKept], self.candidateGains[receiverRow][isKept]
+
+    # fraction of the N x N pairs of stations kept as links
+    def keptFraction(self):
+        return len(self.linkKeys) / float(len(self.x))**2
+
+    # the links kept and the approximationError of up to numReceivers
+    # receivers spread over the deployment, in one line
+    def summary(self, numReceivers = 100):
+        numStations = len(self.x)
+        receivers = arange(0, numStations, max(1, numStations // numReceivers))
+        error = self.approximationError(receivers)
+        return ('culled deployment: cutoff %g W, radius %.0f m, %d of %d pairs kept (%.1f%%), neglected interference '
+                'up to %.3g W (%.3g times the white noise) at %d receivers'
+                % (self.powerCutoff, self.radius, len(self.linkKeys), numStations**2, 100 * self.keptFraction(),
+                   error['maxNeglectedPower'], error['maxRelativeError'], len(receivers)) +
+                (', most pairs are kept so the dense engine would use less memory' if self.keptFraction() > 0.5 else ''))
+
+    # Interference left out by the cutoff at each of the receivers (all stations
+    # if None), from every transmitter of another network outside the candidates.
+    # Returns the largest neglected power, the largest neglected power relative
+    # to the white noise (an upper bound on the relative SINR error) and the
+    # worst-case bound of powerCutoff per neglected transmitter.
+    def approximationError(self, receiverRows=None):
+        if receiverRows is None:
+            receiverRows = range(len(self.x))
+        neglected = []
+        numNeglected = []
+        for row in receiverRows:
+            outside = ones(len(self.x), dtype=bool)
+            outside[self.candidates[row]] = False
+            outside &= self.network != self.network[row]
+            d = sqrt((self.x[outside] - self.x[row])**2 + (self.y[outside] - self.y[row])**2)
+            neglected.append((self.p[outside] * pathLossArray(d)).sum() * self.gr[row])
+            numNeglected.append(count_nonzero(outside))
+        maxNeglectedPower = max(neglected) if neglected else 0.0
+        return {'maxNeglectedPower': maxNeglectedPower,
+                'maxRelativeError': maxNeglectedPower / WHITE_NOISE,
+                'bound': max(numNeglected or [0]) * self.powerCutoff}
+
+# InterferenceState over the links of a CulledDeployment: the received powers
+# and co-channel decisions are kept per link, the aggregates of each receiver
+# summed over its links with bincount, so memory and a refresh are O(links)
+# and a power change touches the links of one station. There is no leading
+# trial axis, and moving stations rebuilds the links (moveStations refreshes).
+class CulledInterferenceState(InterferenceState):
+    def initialiseLinks(self):
+        self.dtype = dtype(float)
+
+    def refresh(self):
+        d = self.deployment
+        d.update()
+        numStations = len(d.network)
+        t, r = d.linkTransmitter, d.linkReceiver
+        self.linkOther = d.network[t] != d.network[r]
+        # the links are symmetric, so the links from a station are the
+        # reverses of the links to it
+        self.outgoing = searchsorted(d.linkKeys, t * numStations + r)
+        self.received = d.p[t] * d.linkGain * d.gr[r]
+        self.cochannel = self.received / self.whiteNoise > d.snrFloor[r]
+        self.interference = bincount(r, self.received * (self.linkOther & ~self.cochannel), numStations)
+        self.logCochannelIdle = bincount(r, self.logIdle[t] * (self.linkOther & self.cochannel), numStations)
+        self.servingLinks = searchsorted(d.linkKeys, self.mobileStationRows * numStations + self.servingAccessPointRows)
+        self.updatePropagationDelay()
+
+    # average distance of the active mobile stations of every network to its AP
+    def updatePropagationDelay(self, j = None):
+        d = self.deployment
+        ms, ap = self.mobileStationRows, self.servingAccessPointRows
+        active = self.active[ms]
+        distance = sqrt((d.x[ms] - d.x[ap])**2 + (d.y[ms] - d.y[ap])**2)
+        network = d.network[ms]
+        self.propagationDelay = bincount(network, distance * active, d.numNetworks) / bincount(network, active, d.numNetworks) / C
+
+    def moveStations(self, rows):
+        if len(rows) > 0:
+            self.refresh()
+
+    def setBufferProbability(self, row, q):
+        d = self.deployment
+        d.q[row] = q
+        tau = estimateTransmissionProbability(CW_MIN, q)
+        logIdle = log(1 - tau)
+        out = self.outgoing[d.linkBounds[row]:d.linkBounds[row + 1]]
+        self.logCochannelIdle[d.linkReceiver[out]] += self.linkOther[out] * (logIdle - self.logIdle[row]) * self.cochannel[out]
+        self.tau[row] = tau
+        self.logIdle[row] = logIdle
+
+    def setPower(self, row, p, snrFloor):
+        d = self.deployment
+        d.p[row] = p
+        d.snrFloor[row] = snrFloor
+        # the links from the station, each to another receiver
+        out = self.outgoing[d.linkBounds[row]:d.linkBounds[row + 1]]
+        r = d.linkReceiver[out]
+        other = self.linkOther[out]
+        received = p * d.linkGain[out] * d.gr[r]
+        cochannel = received / self.whiteNoise > d.snrFloor[r]
+        self.interference[r] += other * (received * ~cochannel - self.received[out] * ~self.cochannel[out])
+        self.logCochannelIdle[r] += other * self.logIdle[row] * (cochannel.astype(float) - self.cochannel[out])
+        self.received[out] = received
+        self.cochannel[out] = cochannel
+        # the new SNR floor changes which transmitters the station itself decodes
+        incoming = slice(d.linkBounds[row], d.linkBounds[row + 1])
+        column = self.received[incoming] / self.whiteNoise > snrFloor
+        other = self.linkOther[incoming]
+        self.cochannel[incoming] = column
+        self.interference[row] = (self.received[incoming] * (other & ~column)).sum()
+        self.logCochannelIdle[row] = (self.logIdle[d.linkTransmitter[incoming]] * (other & column)).sum()
+
+    def sinr(self, transmitterRow, receiverRows):
+        d = self.deployment
+        links = searchsorted(d.linkKeys, asarray(receiverRows) * len(d.network) + transmitterRow)
+        return self.received[links] / (self.interference[receiverRows] + self.whiteNoise)
+
+    def mobileStationSinrs(self):
+        return self.received[self.servingLinks] / (self.interference[self.mobileStationRows] + self.whiteNoise)
@@ -0,0 +1,111 @@
+from numpy import *
+from networkModel import *
+from interferenceState import *
+from powervariation_sim import newApSnrFloor, inRange
+
+# Static AP power assignments evaluated over one fixed geometry, the reference
+# the power control algorithms are compared against. The candidate
+# assignments are the rows of a [candidate, network] matrix of AP powers. Only
+# p and snrFloor carry the leading candidate axis, the gains and everything
+# else being shared, so InterferenceState evaluates every candidate at once.
+
+# received power matrices of all candidates evaluated together are kept under
+# about this many bytes
+CANDIDATE_BYTES = 1 << 27
+
+class StaticPowerDeployment:
+    def __init__(self, deployment, apPowers):
+        d = deployment
+        d.update()
+        for name in ['x', 'y', 'q', 'gr', 'gain', 'distance', 'network', 'numNetworks',
+                     'accessPointRows', 'mobileStationRows']:
+            setattr(self, name, getattr(d, name))
+        self.p = repeat(d.p[newaxis], len(apPowers), axis=0)
+        self.snrFloor = repeat(d.snrFloor[newaxis], len(apPowers), axis=0)
+        self.p[:,d.accessPointRows] = apPowers
+        self.snrFloor[:,d.accessPointRows] = newApSnrFloor(apPowers)
+
+    # the geometry is fixed
+    def update(self):
+        return False
+
+    def networkStations(self, j):
+        return self.network == j
+
+    def otherStations(self, j):
+        return self.network != j
+
+def networksInRange(networks, iRange, jRange):
+    if iRange is None or jRange is None:
+        return arange(len(networks))
+    return array([j for j in range(len(networks)) if inRange(networks[j].index[0], iRange) and inRange(networks[j].index[1], jRange)])
+
+# average throughput S*r of the selected networks under each static assignment
+def averageThroughputs(state, selected):
+    throughputs = state.throughputs(EXPECTED_PACKET_SIZE) * state.dataRates()
+    return throughputs[...,selected].mean(axis=-1)
+
+# one state for the candidates evaluated together, at most chunkSize of them
+def candidateState(deployment, numCandidates, chunkSize):
+    numCandidates = min(numCandidates, chunkSize or max(1, CANDIDATE_BYTES // (9 * len(deployment.network)**2)))
+    return InterferenceState(StaticPowerDeployment(deployment, repeat(deployment.p[newaxis,deployment.accessPointRows], numCandidates, axis=0)))
+
+# the candidate assignments [candidate, network] moved through the candidate
+# axis of the state a chunk at a time with setPowers, in O(N) per AP and
+# candidate, a short last chunk repeating its last assignment
+def candidateThroughputs(state, apPowers, selected):
+    numCandidates = len(state.deployment.p)
+    throughputs = []
+    for start in range(0, len(apPowers), numCandidates):
+        chunk = apPowers[minimum(arange(start, start + numCandidates), len(apPowers) - 1)]
+        state.setPowers(state.deployment.accessPointRows, chunk, newApSnrFloor(chunk))
+        throughputs.append(averageThroughputs(state, selected)[:len(apPowers) - start])
+    return concatenate(throughputs)
+
+# Average throughput of the networks in range (all of them without ranges) for
+# each static assignment. apPowers is either a list of power levels used by
+# every AP or a [candidate, network] matrix of AP powers. The networks are left
+# untouched, unlike with testThroughputUsingPresetPower.
+def staticPowerThroughputs(networks, apPowers, iRange = None, jRange = None, chunkSize = None, deployment = None):
+    deployment = deployment or Deployment(networks)
+    apPowers = asarray(apPowers, dtype=float)
+    if apPowers.ndim == 1:
+        apPowers = apPowers[:,newaxis] * ones(deployment.numNetworks)
+    state = candidateState(deployment, len(apPowers), chunkSize)
+    return candidateThroughputs(state, apPowers, networksInRange(networks, iRange, jRange))
+
+# The throughput-optimal static assignment on a grid of power levels. Every
+# level shared by all APs is tried first, then each sweep lets every AP in
+# turn take each of the levels with the others held at the best assignment so
+# far, the levels of one AP being moved through the candidate axis with
+# setPower. Returns the AP powers of each network and their average throughput.
+def optimalStaticPower(networks, levels, iRange = None, jRange = None, sweeps = 1, chunkSize = None):
+    deployment = Deployment(networks)
+    levels = asarray(levels, dtype=float)
+    selected = networksInRange(networks, iRange, jRange)
+    state = candidateState(deployment, len(levels), chunkSize)
+    numCandidates = len(state.deployment.p)
+    uniform = candidateThroughputs(state, levels[:,newaxis] * ones(deployment.numNetworks), selected)
+    best = argmax(uniform)
+    apPowers = levels[best] * ones(deployment.numNetworks)
+    throughput = uniform[best]
+    candidates = repeat(apPowers[newaxis], numCandidates, axis=0)
+    state.setPowers(deployment.accessPointRows, candidates, newApSnrFloor(candidates))
+    for sweep in range(sweeps):
+        improved = False
+        for j in range(deployment.numNetworks):
+            row = deployment.accessPointRows[j]
+            for start in range(0, len(levels), numCandidates):
+                chunk = levels[minimum(arange(start, start + numCandidates), len(levels) - 1)]
+                state.setPower(row, chunk, newApSnrFloor(chunk))
+                throughputs = averageThroughputs(state, selected)
+                k = argmax(throughputs)
+                if throughputs[k] > throughput:
+                    apPowers[j] = chunk[k]
+                    throughput = throughputs[k]
+                    improved = True
+            p = apPowers[j] * ones(numCandidates)
+            state.setPower(row, p, newApSnrFloor(p))
+        if not improved:
+            break
+    return apPowers, throughput
@@ -0,0 +1,123 @@
+from numpy import *
+import os
+
+# order of the series kept by the recorders, as in the Monte Carlo drivers
+SERIES = ['normalisedThroughput', 'dataRate', 'apPower', 'throughput', 'utility']
+
+# Recording of one network that writes into a row of a preallocated
+# [series, iteration] array instead of growing lists. The series can still be
+# read as lists, like those of a Recording.
+class ArrayRecording:
+    def __init__(self, index, data):
+        self.index = index
+        self.data = data
+        self.length = 0
+        self.iterationsToConverge = None
+
+    def addDataPoint(self, p, gr, S, r, u):
+        self.data[:,self.length] = (S, r, p, S * r, u)
+        self.length += 1
+
+    def pad(self, numPoints):
+        self.data[:,self.length:numPoints] = self.data[:,self.length-1:self.length]
+        self.length = numPoints
+
+    def series(self, name):
+        return list(self.data[SERIES.index(name),:self.length])
+
+    normalisedThroughput = property(lambda self: self.series('normalisedThroughput'))
+    dataRate = property(lambda self: self.series('dataRate'))
+    apPower = property(lambda self: self.series('apPower'))
+    utility = property(lambda self: self.series('utility'))
+
+# Aggregates the time series of every network over Monte Carlo trials as they
+# complete: running mean and variance (Welford) and min/max, held in
+# [series, network, iteration] arrays, so memory does not grow with the number
+# of trials. With a spill prefix the raw series of every trial are also written
+# to disk, chunkSize trials per <prefix>_<chunk>.npy file, and with a
+# resultStore.ResultWriter they are written to its run.
+class StreamingRecorder:
+    def __init__(self, numIterations, spillPrefix = None, chunkSize = 100, store = None):
+        self.numIterations = numIterations
+        self.spillPrefix = spillPrefix
+        self.chunkSize = chunkSize
+        self.store = store
+        self.index = None
+        self.count = 0
+
+    def allocate(self, index):
+        self.index = index
+        shape = (len(SERIES), len(index), self.numIterations)
+        self.current = zeros(shape)
+        self.mean = zeros(shape)
+        self.m2 = zeros(shape)
+        self.min = full(shape, inf)
+        self.max = full(shape, -inf)
+        if self.spillPrefix is not None:
+            self.chunk = zeros((self.chunkSize,) + shape)
+            self.chunkFill = 0
+            self.numChunks = 0
+        if self.store is not None:
+            self.store.allocate(index, self.numIterations)
+
+    # recordings for the networks of a new trial, to be passed to the power
+    # variation algorithms and followed by endTrial()
+    def newTrial(self, networks):
+        if self.index is None:
+            self.allocate(map(lambda network: network.index, networks))
+        self.current[:] = 0
+        return map(lambda j: ArrayRecording(self.index[j], self.current[:,j]), range(len(networks)))
+
+    def endTrial(self):
+        self.addTrial(self.current)
+
+    # series of a batch of trials, indexed [trial, series, network, iteration],
+    # index being the network indexes
+    def addTrials(self, index, series):
+        if self.index is None:
+            self.allocate(list(index))
+        for trialSeries in series:
+            self.addTrial(trialSeries)
+
+    # series of one trial, indexed [series, network, iteration]
+    def addTrial(self, series):
+        self.count += 1
+        delta = series - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (series - self.mean)
+        minimum(self.min, series, out=self.min)
+        maximum(self.max, series, out=self.max)
+        if self.spillPrefix is not None:
+            self.chunk[self.chunkFill] = series
+            self.chunkFill += 1
+            if self.chunkFill == self.chunkSize:
+                self.flush()
+        if self.store is not None:
+            self.store.addTrial(series)
+
+    def flush(self):
+        if self.spillPrefix is not None and self.chunkFill > 0:
+            save(self.spillPrefix + '_%05d.npy' % self.numChunks, self.chunk[:self.chunkFill])
+            self.numChunks += 1
+            self.chunkFill = 0
+
+    def close(self):
+        self.flush()
+        if self.store is not None:
+            self.store.close()
+
+    def sum(self):
+        return self.mean * self.count
+
+    def variance(self):
+        return self.m2 / max(self.count - 1, 1)
+
+    def networksInRange(self, iRange, jRange):
+        return array(map(lambda index: iRange[0] <= index[0] <= iRange[1] and jRange[0] <= index[1] <= jRange[1], self.index))
+
+# the spilled trials of a recorder, memory-mapped chunk by chunk
+def loadSpilledTrials(spillPrefix):
+    numChunks = 0
+    while os.path.exists(spillPrefix + '_%05d.npy' % numChunks):
+        numChunks += 1
+    return map(lambda k: load(spillPrefix + '_%05d.npy' % k, mmap_mode='r'), range(numChunks))
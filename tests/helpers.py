@@ -0,0 +1,38 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from numpy import *
+from numpy.random import RandomState
+from powervariation_sim import *
+
+# Small deployments and the scalar reference of networkModel shared by the
+# tests of the array engine
+
+def smallNetworks(seed = 0):
+    return createNetworks(3, 2, 7, 7, 7, 7, 4, False, seed = seed)
+
+def otherStations(networks, j):
+    return reduce(lambda x, y: x + y, [allStations(networks[k]) for k in range(len(networks)) if k != j])
+
+# S and r of every network from the scalar functions, without a gain matrix
+def scalarMeasurements(networks):
+    S = array([normalisedNetworkThroughput(networks[j], otherStations(networks, j), EXPECTED_PACKET_SIZE)
+               for j in range(len(networks))])
+    r = array([getAverageDataRate20MHZ(networks[j], otherStations(networks, j)) for j in range(len(networks))])
+    return S, r
+
+# a few power changes of mobile stations and access points
+def setSomePowers(state, seed):
+    rGen = RandomState(seed)
+    d = state.deployment
+    for k in range(10):
+        row = d.accessPointRows[rGen.randint(d.numNetworks)] if k % 2 else rGen.randint(len(d.network))
+        p = 0.05 + 0.5 * rGen.rand()
+        state.setPower(row, p, newApSnrFloor(p))
+
+def assertClose(test, actual, expected, tolerance = 1e-12):
+    actual, expected = asarray(actual, dtype=float), asarray(expected, dtype=float)
+    test.assertEqual(actual.shape, expected.shape)
+    test.assertTrue(allclose(actual, expected, rtol=tolerance, atol=0), (actual, expected))
@@ -0,0 +1,30 @@
+import unittest
+
+from helpers import *
+
+def jittered(rGen):
+    return jitteredWakeups(1.0, 0.5, rGen)
+
+def run(seed, wakeup = jittered):
+    recordings = runAsynchronousPowerVariationAlgorithm(smallNetworks(1), 8, wakeup = wakeup, seed = seed)
+    return array(map(lambda r: r.apPower, recordings))
+
+class AsynchronousTest(unittest.TestCase):
+    def testSeedReproducesJitteredRun(self):
+        self.assertTrue(array_equal(run(3), run(3)))
+        self.assertFalse(array_equal(run(3), run(4)))
+
+    def testSeedReproducesPoissonRun(self):
+        self.assertTrue(array_equal(run(3, None), run(3, None)))
+        self.assertFalse(array_equal(run(3, None), run(3)))
+
+    def testJitterWithinPeriod(self):
+        from random import Random
+        wakeup = jitteredWakeups(1.0, 0.5, Random(0))
+        times = map(lambda k: wakeup(), range(1000))
+        self.assertTrue(0.5 <= min(times) and max(times) <= 1.5)
+        self.assertRaises(ValueError, jitteredWakeups, 1.0, 1.0, Random(0))
+        self.assertRaises(ValueError, run, 0, lambda rGen: jitteredWakeups(1.0, 2.0, rGen))
+
+if __name__ == '__main__':
+    unittest.main()
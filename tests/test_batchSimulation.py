@@ -0,0 +1,41 @@
+import unittest
+
+from helpers import *
+from batchSimulation import *
+
+SEEDS = [4, 5, 6]
+
+def serialSeries(recordings):
+    return array([map(lambda r: r.normalisedThroughput, recordings),
+                  map(lambda r: r.dataRate, recordings),
+                  map(lambda r: r.apPower, recordings)])
+
+class BatchedRunsTest(unittest.TestCase):
+    # the batched runs of SEEDS against the serial runs of each of them
+    def assertBatchMatchesSerial(self, synchronous):
+        batch = runBatchedPowerVariationAlgorithm(map(smallNetworks, SEEDS), 6, synchronous = synchronous).series()
+        batchControl = runBatchedPowerVariationAlgorithmControl(map(smallNetworks, SEEDS), 6, 0.5, 0.2, synchronous = synchronous).series()
+        for t in range(len(SEEDS)):
+            serial = serialSeries(runPowerVariationAlgorithm(smallNetworks(SEEDS[t]), 6, synchronous = synchronous))
+            assertClose(self, batch[t,:3], serial)
+            serial = serialSeries(runPowerVariationAlgorithmControl(smallNetworks(SEEDS[t]), 6, 0.5, 0.2, synchronous = synchronous))
+            assertClose(self, batchControl[t,:3], serial)
+
+    def testSequentialUpdates(self):
+        self.assertBatchMatchesSerial(False)
+
+    def testSynchronousUpdates(self):
+        self.assertBatchMatchesSerial(True)
+
+    # every access point of a synchronous iteration takes the power the scalar
+    # controller gives it from the powers at the start of the iteration
+    def testSynchronousStepUsesPreviousPowers(self):
+        recordings = runPowerVariationAlgorithm(smallNetworks(7), 2, synchronous = True)
+        for j in range(len(recordings)):
+            networks = smallNetworks(7)
+            deployment = Deployment(networks)
+            p = newApPower(networks[j], deployment.otherStations(j), 20, InterferenceState(deployment))
+            assertClose(self, recordings[j].apPower[1], p)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+
+from helpers import *
+from batchSimulation import *
+
+class ConvergenceDetectorTest(unittest.TestCase):
+    def testSettlesOncePowersStopChanging(self):
+        detector = ConvergenceDetector(powerTolerance = 0.01)
+        done = map(detector.update, [[0.1, 0.2], [0.2, 0.2], [0.205, 0.2], [0.205, 0.2]])
+        self.assertEqual(done, [False, False, True, True])
+        self.assertEqual(detector.iterationsToConverge, 3)
+        detector.finish()
+        self.assertEqual(detector.history, [3])
+        self.assertFalse(detector.converged)
+
+    # utilities are compared relative to their size, or absolutely below 1
+    def testUtilityTolerance(self):
+        detector = ConvergenceDetector(powerTolerance = 1, utilityTolerance = 0.01)
+        detector.update([0.1], [100.0])
+        self.assertTrue(detector.update([0.1], [100.5]))
+        detector.reset()
+        detector.update([0.1], [0.5])
+        self.assertFalse(detector.update([0.1], [0.52]))
+
+    def testTrialsConvergeOnTheirOwn(self):
+        detector = ConvergenceDetector(powerTolerance = 0.01)
+        detector.update([[0.1], [0.1]])
+        self.assertFalse(detector.update([[0.1], [0.3]]))
+        self.assertTrue(detector.update([[0.5], [0.3]]))
+        self.assertTrue(array_equal(detector.iterationsToConverge, [2, 3]))
+
+    def testMaxIterations(self):
+        detector = ConvergenceDetector(powerTolerance = 0, maxIterations = 2)
+        self.assertEqual(map(lambda p: detector.update([p]), [0.1, 0.2]), [False, True])
+        self.assertEqual(detector.iterationsToConverge, -1)
+
+class BatchRecordingPadTest(unittest.TestCase):
+    def testPadsFromConvergenceOrLastIteration(self):
+        recording = BatchRecording([(0,0)], 2, 5)
+        for i in range(3):
+            recording.addDataPoint(0, i, [i, 10 + i], 0, 0, 0, 0)
+        recording.pad(2, array([2, -1]))
+        self.assertTrue(array_equal(recording.apPower[:,0], [[0, 1, 1, 1, 1], [10, 11, 12, 12, 12]]))
+
+    def testNoIterationRun(self):
+        recording = BatchRecording([(0,0)], 2, 0)
+        recording.pad(-1, -1)
+        recording = runBatchedPowerVariationAlgorithm(map(smallNetworks, [1, 2]), 0, convergence = ConvergenceDetector())
+        self.assertEqual(recording.apPower.shape, (2, 6, 0))
+        self.assertTrue(array_equal(recording.iterationsToConverge, [-1, -1]))
+        self.assertEqual(recording.trialRecordings(1)[0].apPower, [])
+
+    # a batched run stopped early gives every trial the series of its own
+    # serial run, padded from the iteration it converged at
+    def testBatchedEarlyStopMatchesSerial(self):
+        seeds = [1, 2, 3]
+        batch = runBatchedPowerVariationAlgorithm(map(smallNetworks, seeds), 40, convergence = ConvergenceDetector(1e-3, 1e-3))
+        self.assertTrue((batch.iterationsToConverge > 0).all())
+        self.assertEqual(len(set(batch.iterationsToConverge)), len(seeds))
+        for t in range(len(seeds)):
+            convergence = ConvergenceDetector(1e-3, 1e-3)
+            serial = runPowerVariationAlgorithm(smallNetworks(seeds[t]), 40, convergence = convergence)
+            assertClose(self, batch.apPower[t], map(lambda r: r.apPower, serial))
+            self.assertEqual(batch.iterationsToConverge[t], convergence.history[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+
+from helpers import *
+
+class InterferenceStateTest(unittest.TestCase):
+    def testMatchesScalarModel(self):
+        networks = smallNetworks(1)
+        state = InterferenceState(Deployment(networks))
+        setSomePowers(state, 1)
+        S, r = scalarMeasurements(networks)
+        assertClose(self, state.throughputs(EXPECTED_PACKET_SIZE), S)
+        assertClose(self, state.dataRates(), r)
+        assertClose(self, map(lambda j: state.throughput(j, EXPECTED_PACKET_SIZE), range(len(networks))), S)
+        assertClose(self, map(state.dataRate, range(len(networks))), r)
+
+    def testIncrementalUpdatesMatchRefresh(self):
+        networks = smallNetworks(2)
+        d = Deployment(networks)
+        state = InterferenceState(d)
+        setSomePowers(state, 2)
+        rows = [0, 5, d.accessPointRows[3]]
+        d.x[rows] += 3.0
+        d.y[rows] -= 2.0
+        state.moveStations(rows)
+        state.setBufferProbability(7, 0.2)
+        fresh = InterferenceState(Deployment(networks))
+        fresh.setBufferProbability(7, 0.2)
+        for name in ['interference', 'logCochannelIdle', 'propagationDelay']:
+            assertClose(self, getattr(state, name), getattr(fresh, name))
+        self.assertTrue((state.cochannel == fresh.cochannel).all())
+        assertClose(self, state.throughputs(EXPECTED_PACKET_SIZE), fresh.throughputs(EXPECTED_PACKET_SIZE))
+        assertClose(self, state.dataRates(), fresh.dataRates())
+
+if __name__ == '__main__':
+    unittest.main()
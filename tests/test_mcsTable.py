@@ -0,0 +1,54 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from helpers import *
+
+# MCS of the if/elif ladder getAverageDataRate20MHZ used before McsTable, and
+# its rates, the "no MCS" key 00 being the same key as 0
+def ladderMcs(snr):
+    if snr<3:
+        return 00
+    elif snr<5:
+        return 0
+    elif snr<9:
+        return 1
+    elif snr<11:
+        return 2
+    elif snr<15:
+        return 3
+    elif snr<18:
+        return 4
+    elif snr<20:
+        return 5
+    elif snr<25:
+        return 6
+    return 7
+
+LADDER_RATES = {00: 0, 0: 6.5, 1: 13, 2: 19.5, 3: 26, 4: 39, 5: 52, 6: 58.5, 7: 65}
+
+class McsTableTest(unittest.TestCase):
+    def testMatchesLadderAtThresholdEdges(self):
+        thresholds = MCS_TABLE_20MHZ.thresholds
+        snrs = concatenate([thresholds, nextafter(thresholds, -inf), nextafter(thresholds, inf), [-1.0, 0.0, 1e-3, 100.0, inf]])
+        for snr in snrs:
+            mcs, rate = MCS_TABLE_20MHZ.lookup(snr)
+            self.assertEqual(mcs, ladderMcs(snr), snr)
+            self.assertEqual(rate, LADDER_RATES[ladderMcs(snr)], snr)
+        self.assertTrue(array_equal(MCS_TABLE_20MHZ.dataRate(snrs), map(lambda snr: LADDER_RATES[ladderMcs(snr)], snrs)))
+
+    def testLoadMcsTable(self):
+        directory = tempfile.mkdtemp()
+        try:
+            fileName = os.path.join(directory, 'table.json')
+            with open(fileName, 'w') as f:
+                json.dump(dict(thresholds=[10], mcs=[0, 1], rates=[6.5, 13]), f)
+            table = loadMcsTable(fileName)
+            self.assertTrue(array_equal(table.dataRate([9.9, 10, 11]), [6.5, 13, 13]))
+        finally:
+            shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+
+from helpers import *
+from mobility import *
+import copy
+
+class MobilityTest(unittest.TestCase):
+    # the incrementally updated state against one refreshed from scratch with
+    # the same positions, powers and active stations. The networks are copied
+    # as a Deployment takes over the stations of the networks it is built on.
+    def assertMatchesRefresh(self, networks, state):
+        fresh = InterferenceState(Deployment(copy.deepcopy(networks)))
+        fresh.active = state.active.copy()
+        fresh.updateMobileStationWeights()
+        fresh.refresh()
+        for name in ['interference', 'logCochannelIdle', 'propagationDelay', 'mobileStationWeights']:
+            assertClose(self, getattr(state, name), getattr(fresh, name))
+        self.assertTrue((state.cochannel == fresh.cochannel).all())
+        assertClose(self, state.throughputs(EXPECTED_PACKET_SIZE), fresh.throughputs(EXPECTED_PACKET_SIZE))
+        assertClose(self, state.dataRates(), fresh.dataRates())
+
+    def testChurnMatchesRefresh(self):
+        networks = smallNetworks(5)
+        state = InterferenceState(Deployment(networks))
+        churn = Churn(networks, 0.3, 0.5, seed = 1)
+        departures = arrivals = 0
+        for step in range(6):
+            departing, arriving = churn.step(state)
+            departures += len(departing)
+            arrivals += len(arriving)
+            self.assertMatchesRefresh(networks, state)
+        self.assertTrue(departures > 0 and arrivals > 0)
+        d = state.deployment
+        for rows in d.mobileStationRows:
+            self.assertTrue(state.active[rows].any())
+        self.assertTrue((d.p[~state.active] == 0).all())
+
+    def testSetActiveMatchesRefresh(self):
+        networks = smallNetworks(6)
+        state = InterferenceState(Deployment(networks))
+        row = state.deployment.mobileStationRows[2][1]
+        state.setPower(row, 0.0, state.deployment.snrFloor[row])
+        state.setBufferProbability(row, 0.0)
+        state.setActive(row, False)
+        self.assertMatchesRefresh(networks, state)
+
+    def testRandomWaypointMatchesRefresh(self):
+        networks = smallNetworks(7)
+        state = InterferenceState(Deployment(networks))
+        waypoint = RandomWaypoint(networks, 2.0, pause = 1, seed = 2)
+        before = state.deployment.x.copy()
+        for step in range(5):
+            waypoint.step(state)
+            self.assertMatchesRefresh(networks, state)
+        self.assertFalse(array_equal(state.deployment.x, before))
+        for j in range(len(networks)):
+            rows = state.deployment.mobileStationRows[j]
+            self.assertTrue((state.deployment.x[rows] >= networks[j].xOffset).all())
+            self.assertTrue((state.deployment.x[rows] <= networks[j].xOffset + networks[j].width).all())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,18 @@
+import unittest
+
+from helpers import *
+
+class NetworkThroughputsTest(unittest.TestCase):
+    def testMatchesScalarModel(self):
+        networks = smallNetworks()
+        S, r = scalarMeasurements(networks)
+        assertClose(self, networkThroughputs(Deployment(networks), EXPECTED_PACKET_SIZE), S)
+
+    def testNetworkSums(self):
+        values = arange(12.0).reshape(2, 6)
+        network = array([0, 0, 1, 1, 1, 2])
+        assertClose(self, networkSums(values[0], network, 4), [1, 9, 5, 0])
+        assertClose(self, networkSums(values, network, 4), [[1, 9, 5, 0], [13, 27, 11, 0]])
+
+if __name__ == '__main__':
+    unittest.main()
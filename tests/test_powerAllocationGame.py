@@ -0,0 +1,69 @@
+import os
+import sys
+import unittest
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from numpy import *
+from powerAllocationGame import *
+
+def systems(seed, numSystems, numUsers):
+    random.seed(seed)
+    return gainMatrices(*allocateSystems(numSystems, numUsers))
+
+def residuals(gain, p, pMax, c):
+    return abs(p - bestResponses(gain, p, 1e-12, pMax, c)).max(axis=-1)
+
+class EquilibriumTest(unittest.TestCase):
+    # the first seed has a system on which sequential play cycles
+    def testEverySystemReachesTheEquilibrium(self):
+        for seed in [0, 3]:
+            gain = systems(seed, 1000, 20)
+            p, residual, iterations = solveEquilibrium(gain, 0.1*ones((1000, 20)), 1e-12, 4.0, 0.25)
+            self.assertTrue((residual <= 1e-12).all())
+            self.assertTrue(array_equal(residual, residuals(gain, p, 4.0, 0.25)))
+            self.assertTrue(0 < iterations <= 50)
+            self.assertTrue(allclose(nextPowerConfigurationSequential(gain, p, 1e-12, 4.0, 0.25), p, rtol=0, atol=1e-11))
+
+    def testStartingAtTheEquilibrium(self):
+        gain = systems(1, 50, 5)
+        p, residual, iterations = solveEquilibrium(gain, 0.1*ones((50, 5)), 1e-12, 2.0, 0.5)
+        self.assertEqual(solveEquilibrium(gain, p, 1e-12, 2.0, 0.5)[2], 0)
+
+    def testLemkeWithoutIterationsOrSweeps(self):
+        gain = systems(0, 1000, 20)
+        p, residual, iterations = solveEquilibrium(gain, 0.1*ones((1000, 20)), 1e-12, 4.0, 0.25, maxIterations = 0, fallbackSweeps = 0)
+        self.assertEqual(iterations, 0)
+        self.assertTrue((residual <= 1e-12).all())
+
+    def testLemke(self):
+        A = array([[2.0, 1.0], [1.0, 2.0]])
+        z = lemke(A, array([-5.0, -6.0]))
+        self.assertTrue(allclose(z, [4.0 / 3, 7.0 / 3]))
+        self.assertTrue(array_equal(lemke(A, array([1.0, 0.0])), [0, 0]))
+
+    def testSweepPointsTakeTheirOwnPMaxAndC(self):
+        gain = systems(2, 100, 6)
+        pMax, c = meshgrid([1.0, 4.0], [0.25, 1.0], indexing='ij')
+        p, residual, iterations = solveEquilibrium(gain, 0.1*ones((2, 2, 100, 6)), 1e-12, pMax[...,newaxis], c[...,newaxis])
+        for i in range(2):
+            for j in range(2):
+                self.assertTrue((residuals(gain, p[i,j], pMax[i,j], c[i,j]) <= 1e-12).all())
+
+    def testUnconvergedSystemsAreReported(self):
+        gain = systems(4, 20, 4)
+        with warnings.catch_warnings(record = True) as caught:
+            warnings.simplefilter('always')
+            p, converged = equilibriumPowers(gain, 0.1*ones((20, 4)), 1e-12, 1.0, 0.5, tolerance = -1)
+        self.assertFalse(converged.any())
+        self.assertEqual(len(caught), 1)
+        self.assertTrue('20 of 20 systems' in str(caught[0].message))
+        with warnings.catch_warnings(record = True) as caught:
+            warnings.simplefilter('always')
+            p, converged = equilibriumPowers(gain, 0.1*ones((20, 4)), 1e-12, 1.0, 0.5)
+        self.assertTrue(converged.all())
+        self.assertEqual(caught, [])
+
+if __name__ == '__main__':
+    unittest.main()
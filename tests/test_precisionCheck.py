@@ -0,0 +1,45 @@
+import unittest
+import warnings
+
+from helpers import *
+from batchSimulation import *
+from precisionCheck import *
+import precisionCheck
+
+class PrecisionCheckTest(unittest.TestCase):
+    def testFloat32WithinTolerance(self):
+        errors = precisionErrors(smallNetworks(1), float32)
+        self.assertTrue(0 < errors['throughput'] <= PRECISION_TOLERANCE['throughput'])
+        self.assertTrue(0 < errors['sinr'] <= PRECISION_TOLERANCE['sinr'])
+        self.assertEqual(checkPrecision(smallNetworks(1), float32), {})
+        self.assertEqual(precisionErrors(smallNetworks(1), float64)['sinr'], 0)
+
+    def testErrorsAboveTolerance(self):
+        exceeded = checkPrecision(smallNetworks(1), float32, dict(throughput=0, sinr=1))
+        self.assertEqual(sorted(exceeded), ['throughput'])
+        self.assertEqual(exceeded['throughput'], precisionErrors(smallNetworks(1), float32)['throughput'])
+
+    def testBatchFallsBackToFloat64(self):
+        reference = runBatchedPowerVariationAlgorithm(map(smallNetworks, [1, 2]), 4).series()
+        tolerance = precisionCheck.PRECISION_TOLERANCE['throughput']
+        try:
+            precisionCheck.PRECISION_TOLERANCE['throughput'] = 0
+            with warnings.catch_warnings(record = True) as caught:
+                warnings.simplefilter('always')
+                series = runBatchedPowerVariationAlgorithm(map(smallNetworks, [1, 2]), 4, dtype = float32).series()
+        finally:
+            precisionCheck.PRECISION_TOLERANCE['throughput'] = tolerance
+        self.assertEqual(len(caught), 1)
+        self.assertTrue('float64' in str(caught[0].message) and 'throughput' in str(caught[0].message))
+        self.assertTrue(array_equal(series, reference))
+
+    def testBatchKeepsFloat32WithinTolerance(self):
+        with warnings.catch_warnings(record = True) as caught:
+            warnings.simplefilter('always')
+            series = runBatchedPowerVariationAlgorithm(map(smallNetworks, [1, 2]), 4, dtype = float32).series()
+        self.assertEqual(caught, [])
+        reference = runBatchedPowerVariationAlgorithm(map(smallNetworks, [1, 2]), 4).series()
+        self.assertTrue(allclose(series, reference, rtol=1e-4))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from numpy import *
+import networkModel
+from resultCache import *
+
+class ResultCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def testKeySensitivity(self):
+        key = cacheKey(dict(c=20, n=6), 0)
+        self.assertEqual(cacheKey(dict(n=6, c=20), 0), key)
+        self.assertNotEqual(cacheKey(dict(c=21, n=6), 0), key)
+        self.assertNotEqual(cacheKey(dict(c=20, n=6), 1), key)
+        whiteNoise = networkModel.WHITE_NOISE
+        try:
+            networkModel.WHITE_NOISE = 2 * whiteNoise
+            self.assertNotEqual(cacheKey(dict(c=20, n=6), 0), key)
+        finally:
+            networkModel.WHITE_NOISE = whiteNoise
+        self.assertEqual(cacheKey(dict(c=20, n=6), 0), key)
+
+    # numpy's upper case names carried by networkModel are not constants
+    def testModelConstants(self):
+        self.assertEqual(sorted(modelConstants()), sorted(MODEL_CONSTANTS + ['MCS_TABLE_20MHZ']))
+
+    def testRoundTrip(self):
+        cache = ResultCache(self.root)
+        self.assertEqual(cache.get(dict(c=20), 0), None)
+        cache.put(dict(c=20), 0, arange(6.0).reshape(2, 3))
+        self.assertTrue(array_equal(cache.get(dict(c=20), 0), arange(6.0).reshape(2, 3)))
+        self.assertEqual(cache.get(dict(c=20), 1), None)
+
+    def testLeastRecentlyUsedIsEvicted(self):
+        cache = ResultCache(self.root, maxBytes = float('inf'))
+        for k, c in enumerate([1, 2, 3]):
+            cache.put(dict(c=c), 0, zeros(10))
+            past = time.time() - 100 + k
+            os.utime(cache.fileName(cacheKey(dict(c=c), 0)), (past, past))
+        cache.get(dict(c=1), 0)
+        cache.maxBytes = 3 * cache.entries()[0][1]
+        cache.put(dict(c=4), 0, zeros(10))
+        self.assertEqual(map(lambda c: cache.get(dict(c=c), 0) is not None, [1, 2, 3, 4]), [True, False, True, True])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from numpy import *
+from resultStore import *
+from parallelRunner import runPoints, runTrial, pointRunName, trialSeed
+
+POINT = dict(a=3, b=2, iRange=[0,2], jRange=[0,1], width=7, length=7, xSpace=7, ySpace=7, n=4, numIterations=5, c=20)
+
+class ResultStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def testRoundTrip(self):
+        store = ResultStore(self.root)
+        series = arange(3 * len(SERIES) * 2 * 4, dtype=float).reshape(3, len(SERIES), 2, 4)
+        writer = store.writer('run', dict(algorithm='ODE', c=20, seed=7), 5)
+        writer.allocate([(0,0), (0,1)], 4)
+        for trial in series:
+            writer.addTrial(trial)
+        self.assertFalse(store.hasRun('run'))
+        writer.close()
+        run = store.run('run')
+        self.assertEqual(run.index, [(0,0), (0,1)])
+        self.assertEqual(run.numTrials, 3)
+        self.assertEqual(run.metadata['seed'], 7)
+        for k in range(len(SERIES)):
+            self.assertTrue(array_equal(getattr(run, SERIES[k]), series[:,k]))
+        self.assertTrue(allclose(run.mean('apPower', chunkSize = 2), series[:,SERIES.index('apPower')].mean(axis=0)))
+        self.assertEqual(store.runs(algorithm='ODE', c=20), ['run'])
+        self.assertEqual(store.runs(c=30), [])
+
+    def testRunPointsStoresEveryTrial(self):
+        store = ResultStore(self.root)
+        averages, = runPoints([POINT], 3, seed = 2, numWorkers = 1, store = store)
+        run = store.run(pointRunName(POINT))
+        self.assertTrue(store.hasRun(pointRunName(POINT)))
+        self.assertEqual(run.metadata['seed'], 2)
+        self.assertEqual(run.metadata['trialSeeds'], map(lambda t: trialSeed(2, t, 3), range(3)))
+        for t in range(3):
+            trial = runTrial((POINT, run.metadata['trialSeeds'][t]))
+            for k in range(len(SERIES)):
+                self.assertTrue(array_equal(getattr(run, SERIES[k])[t], trial[k]))
+        self.assertTrue(allclose(averages, array(map(lambda name: run.mean(name), SERIES))))
+
+if __name__ == '__main__':
+    unittest.main()
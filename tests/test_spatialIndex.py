@@ -0,0 +1,40 @@
+import unittest
+
+from helpers import *
+from spatialIndex import *
+
+class SpatialIndexTest(unittest.TestCase):
+    def testPairsWithinMatchesBruteForce(self):
+        rGen = RandomState(0)
+        x, y = 100 * rGen.rand(2, 200)
+        index = SpatialIndex(x, y, 7.0)
+        first, second = index.pairsWithin(12.0)
+        near = (x[:,newaxis] - x)**2 + (y[:,newaxis] - y)**2 <= 12.0**2
+        self.assertEqual(sorted(zip(first, second)), sorted(zip(*nonzero(near))))
+        self.assertTrue(array_equal(index.within(50, 50, 12.0), nonzero((x - 50)**2 + (y - 50)**2 <= 12.0**2)[0]))
+
+class CulledStateTest(unittest.TestCase):
+    def testWithoutCutoffMatchesDense(self):
+        networks = smallNetworks(3)
+        dense = InterferenceState(Deployment(networks))
+        culled = CulledInterferenceState(CulledDeployment(networks, 1e-30))
+        setSomePowers(dense, 3)
+        setSomePowers(culled, 3)
+        assertClose(self, culled.throughputs(EXPECTED_PACKET_SIZE), dense.throughputs(EXPECTED_PACKET_SIZE))
+        assertClose(self, culled.dataRates(), dense.dataRates())
+
+    # the links kept are those within the cutoff radius or in the same network
+    def testKeptLinks(self):
+        networks = createNetworks(4, 4, 7, 7, 14, 14, 4, False, seed = 1)
+        d = CulledDeployment(networks, 1e-9)
+        N = len(d.x)
+        distance = sqrt((d.x[:,newaxis] - d.x)**2 + (d.y[:,newaxis] - d.y)**2)
+        kept = (distance <= d.radius) | (d.network[:,newaxis] == d.network)
+        self.assertTrue(kept.sum() < N * N)
+        self.assertTrue(array_equal(d.linkKeys, sort(nonzero(kept.ravel())[0])))
+        assertClose(self, d.linkGain, pathLossArray(distance[d.linkReceiver, d.linkTransmitter]))
+        self.assertEqual(d.keptFraction(), kept.mean())
+        self.assertTrue('%d of %d pairs kept' % (kept.sum(), N * N) in d.summary())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import itertools
+import unittest
+
+from helpers import *
+from staticPower import *
+
+I_RANGE, J_RANGE = [1,2], [0,1]
+LEVELS = [0.05, 0.2, 0.5, 1.0]
+
+# findAverageThroughput of the networks of seed with the given AP powers
+def presetThroughput(seed, apPowers):
+    networks = smallNetworks(seed)
+    for network, p in zip(networks, apPowers):
+        network.accessPoint.p = p
+        network.accessPoint.snrFloor = newApSnrFloor(p)
+    return findAverageThroughput(networks, I_RANGE, J_RANGE)
+
+class StaticPowerTest(unittest.TestCase):
+    def testMatchesPresetPower(self):
+        throughputs = staticPowerThroughputs(smallNetworks(1), LEVELS, I_RANGE, J_RANGE)
+        preset = map(lambda level: testThroughputUsingPresetPower(smallNetworks(1), level, I_RANGE, J_RANGE), LEVELS)
+        assertClose(self, throughputs, preset)
+
+    def testChunksMatchOnePass(self):
+        apPowers = RandomState(2).choice(LEVELS, (7, 6))
+        throughputs = staticPowerThroughputs(smallNetworks(2), apPowers, I_RANGE, J_RANGE)
+        assertClose(self, staticPowerThroughputs(smallNetworks(2), apPowers, I_RANGE, J_RANGE, chunkSize = 3), throughputs)
+        assertClose(self, throughputs, map(lambda p: presetThroughput(2, p), apPowers))
+
+    def testNetworksAreLeftUntouched(self):
+        networks = smallNetworks(3)
+        before = map(lambda network: network.accessPoint.p, networks)
+        staticPowerThroughputs(networks, LEVELS)
+        optimalStaticPower(networks, LEVELS)
+        self.assertEqual(map(lambda network: network.accessPoint.p, networks), before)
+
+    # the search against the preset throughput of its assignment, every
+    # uniform level and every assignment of three levels
+    def testOptimalStaticPower(self):
+        levels = LEVELS[:3]
+        apPowers, throughput = optimalStaticPower(smallNetworks(4), levels, I_RANGE, J_RANGE, sweeps = 3, chunkSize = 2)
+        assertClose(self, throughput, presetThroughput(4, apPowers))
+        for level in levels:
+            self.assertTrue(throughput >= testThroughputUsingPresetPower(smallNetworks(4), level, I_RANGE, J_RANGE))
+        everyAssignment = array(list(itertools.product(levels, repeat = 6)))
+        best = staticPowerThroughputs(smallNetworks(4), everyAssignment, I_RANGE, J_RANGE).max()
+        self.assertTrue(throughput <= best * (1 + 1e-12))
+
+if __name__ == '__main__':
+    unittest.main()
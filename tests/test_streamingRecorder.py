@@ -0,0 +1,49 @@
+import shutil
+import tempfile
+import unittest
+
+from helpers import *
+from streamingRecorder import *
+
+class StreamingRecorderTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testMeanAndVarianceMatchNumpy(self):
+        series = 1e6 + RandomState(0).randn(7, len(SERIES), 3, 4)
+        recorder = StreamingRecorder(4)
+        recorder.addTrials([(0,0), (0,1), (1,0)], series[:3])
+        for trial in series[3:]:
+            recorder.addTrial(trial)
+        self.assertEqual(recorder.count, 7)
+        assertClose(self, recorder.mean, series.mean(axis=0))
+        assertClose(self, recorder.variance(), series.var(axis=0, ddof=1), 1e-8)
+        assertClose(self, recorder.sum(), series.sum(axis=0))
+        self.assertTrue(array_equal(recorder.min, series.min(axis=0)))
+        self.assertTrue(array_equal(recorder.max, series.max(axis=0)))
+
+    def testSpillRoundTrip(self):
+        series = RandomState(1).rand(5, len(SERIES), 2, 3)
+        prefix = os.path.join(self.directory, 'trials')
+        recorder = StreamingRecorder(3, prefix, chunkSize = 2)
+        recorder.addTrials([(0,0), (0,1)], series)
+        recorder.close()
+        chunks = loadSpilledTrials(prefix)
+        self.assertEqual(map(len, chunks), [2, 2, 1])
+        self.assertTrue(array_equal(concatenate(chunks), series))
+
+    # the serial runs record straight into the recorder's buffers
+    def testSerialTrialsMatchRecordings(self):
+        recorder = StreamingRecorder(5)
+        expected = []
+        for seed in [1, 2]:
+            recordings = runPowerVariationAlgorithm(smallNetworks(seed), 5, recordings = recorder.newTrial(smallNetworks(seed)))
+            expected.append(map(lambda name: map(lambda r: getattr(r, name), recordings), ['normalisedThroughput', 'dataRate', 'apPower']))
+            recorder.endTrial()
+        assertClose(self, recorder.mean[:3], mean(expected, axis=0))
+
+if __name__ == '__main__':
+    unittest.main()